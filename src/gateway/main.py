@@ -1,3 +1,6 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from fastapi import FastAPI, Response
@@ -8,7 +11,10 @@ from loguru import logger
 
 from shared import get_settings
 
-from .routes import documents
+from . import tasks as gateway_tasks
+from .routes import documents, files, webhooks
+from .services import runpod_events
+from .store import document_store
 
 settings = get_settings()
 
@@ -34,11 +40,32 @@ app.add_middleware(
 )
 
 app.include_router(documents.router, prefix=settings.api_prefix)
+app.include_router(files.router, prefix=settings.api_prefix)
+app.include_router(webhooks.router, prefix=settings.api_prefix)
 
 
 @app.on_event("startup")
 async def startup_event() -> None:
     logger.info("Gateway starting up in environment={}", settings.environment)
+    # One bounded, named pool for blocking work (file purges, broker publishes); installing it as
+    # the loop's default executor routes every asyncio.to_thread call through it.
+    app.state.blocking_pool = ThreadPoolExecutor(
+        max_workers=min(32, (os.cpu_count() or 4) * 4),
+        thread_name_prefix="io",
+    )
+    asyncio.get_running_loop().set_default_executor(app.state.blocking_pool)
+
+    try:
+        await asyncio.to_thread(gateway_tasks.warm_broker_connection)
+    except Exception as exc:  # pragma: no cover - broker may come up after the gateway
+        logger.warning("Could not pre-open broker connection: {}", exc)
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    await runpod_events.close()
+    await document_store.close()
+    app.state.blocking_pool.shutdown(wait=False)
 
 
 @app.get("/", include_in_schema=False)
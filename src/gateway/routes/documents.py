@@ -1,38 +1,39 @@
 from __future__ import annotations
 
 import asyncio
-from typing import List
-
 from pathlib import Path
+from typing import Awaitable, Callable, List
+from urllib.parse import unquote
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, Response, UploadFile
+from fastapi import APIRouter, File, Header, HTTPException, Query, Request, Response, UploadFile
 from loguru import logger
 
-from shared.config import Settings, get_settings
+from shared import get_settings
 from shared.schemas import DocumentJob, DocumentStatus, TaskType
 
 from .. import tasks as gateway_tasks
 from ..services import storage
 from ..store import document_store
 
-router = APIRouter(tags=["documents"])
+settings = get_settings()
 
+router = APIRouter(tags=["documents"])
 
-def get_config() -> Settings:
-    return get_settings()
+ALLOWED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".webp"}
 
 
+# The read endpoints return the store's cached JSON directly; response_model only documents the schema.
 @router.get("/documents", response_model=List[DocumentJob])
-async def list_documents() -> List[DocumentJob]:
-    return await document_store.list_jobs()
+async def list_documents() -> Response:
+    return Response(content=await document_store.list_jobs_json(), media_type="application/json")
 
 
 @router.get("/documents/{job_id}", response_model=DocumentJob)
-async def get_document(job_id: str) -> DocumentJob:
-    job = await document_store.get_job(job_id)
-    if job is None:
+async def get_document(job_id: str) -> Response:
+    content = await document_store.get_job_json(job_id)
+    if content is None:
         raise HTTPException(status_code=404, detail="Document not found")
-    return job
+    return Response(content=content, media_type="application/json")
 
 
 @router.post(
@@ -41,46 +42,83 @@ async def get_document(job_id: str) -> DocumentJob:
     status_code=201,
 )
 async def upload_document(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     tasks: List[TaskType] = Query([TaskType.LAYOUT, TaskType.ROOMS, TaskType.ANNOTATIONS]),
-    settings: Settings = Depends(get_config),
 ) -> DocumentJob:
-    allowed_extensions = {".pdf", ".png", ".jpg", ".jpeg", ".webp"}
-    extension = Path(file.filename).suffix.lower()
-    if extension not in allowed_extensions:
+    return await _accept_upload(
+        file.filename,
+        tasks,
+        lambda job_id: storage.persist_upload(file, job_id),
+    )
+
+
+@router.post(
+    "/documents:stream",
+    response_model=DocumentJob,
+    status_code=201,
+)
+async def upload_document_stream(
+    request: Request,
+    filename: str = Header(..., alias="X-Filename", description="Percent-encoded original filename."),
+    tasks: List[TaskType] = Query([TaskType.LAYOUT, TaskType.ROOMS, TaskType.ANNOTATIONS]),
+) -> DocumentJob:
+    """Accept the raw file as the request body and stream it straight to disk (preferred for large files)."""
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit():
+        # Declared oversize bodies are refused before a job exists; chunked ones are checked while streaming.
+        try:
+            storage.check_upload_size(int(content_length))
+        except storage.UploadTooLargeError as exc:
+            raise HTTPException(status_code=413, detail=str(exc)) from exc
+    filename = unquote(filename)
+    return await _accept_upload(
+        filename,
+        tasks,
+        lambda job_id: storage.persist_stream(request.stream(), filename, job_id),
+    )
+
+
+async def _accept_upload(
+    filename: str,
+    tasks: List[TaskType],
+    persist: Callable[[str], Awaitable[str]],
+) -> DocumentJob:
+    extension = Path(filename).suffix.lower()
+    if extension not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
             detail="Only PDF or image uploads (png, jpg, webp) are supported",
         )
 
-    job = await document_store.create_job(filename=file.filename, tasks=tasks)
-    storage_uri = await storage.persist_upload(file, job.id)
-    job_metadata = {
+    job = await document_store.create_job(filename=filename, tasks=tasks)
+    try:
+        storage_uri = await persist(job.id)
+    except Exception as exc:
+        # A rejected, interrupted or failed upload must not leave the job pending forever.
+        logger.warning("Upload for job {} failed: {}", job.id, exc)
+        await document_store.update_status(job.id, DocumentStatus.FAILED)
+        if isinstance(exc, storage.UploadTooLargeError):
+            raise HTTPException(status_code=413, detail=str(exc)) from exc
+        raise
+    # The store hands out its own instance (as update_status does), so trusted server-side values
+    # are assigned in place rather than copying the model.
+    job.storage_uri = storage_uri
+    job.status = DocumentStatus.PROCESSING
+    job.metadata = {
         "storage": "local",
         "path": storage_uri,
         "dpi": settings.page_image_dpi,
         "source_extension": extension or ".pdf",
     }
-    job = job.model_copy(
-        update={
-            "storage_uri": storage_uri,
-            "status": DocumentStatus.PROCESSING,
-            "metadata": job_metadata,
-        }
-    )
     await document_store.upsert(job)
 
-    background_tasks.add_task(gateway_tasks.enqueue_document_processing, job, storage_uri)
-    logger.info("Job %s queued with tasks=%s", job.id, tasks)
+    await _enqueue_processing(job, storage_uri)
+    logger.info("Job {} queued with tasks={}", job.id, tasks)
     return job
 
 
 @router.post("/documents/{job_id}/qa", status_code=202)
-async def trigger_qa(
-    job_id: str,
-    background_tasks: BackgroundTasks,
-) -> dict[str, str]:
+async def trigger_qa(job_id: str) -> dict[str, str]:
     job = await document_store.get_job(job_id)
     if job is None:
         raise HTTPException(status_code=404, detail="Document not found")
@@ -91,10 +129,26 @@ async def trigger_qa(
         job.tasks.append(TaskType.QA)
         await document_store.upsert(job)
 
-    background_tasks.add_task(gateway_tasks.enqueue_document_processing, job, job.storage_uri)
+    await _enqueue_processing(job, job.storage_uri)
     return {"status": "queued"}
 
 
+async def _enqueue_processing(job: DocumentJob, storage_uri: str) -> None:
+    """
+    Hand the job to the Celery broker before responding.
+
+    Rasterisation and RunPod calls run in the Celery workers, so the gateway only pays for the
+    broker publish; failures surface to the caller instead of being lost after the response.
+    """
+
+    try:
+        await asyncio.to_thread(gateway_tasks.enqueue_document_processing, job, storage_uri)
+    except Exception as exc:
+        logger.exception("Failed to queue job {} for processing", job.id)
+        await document_store.update_status(job.id, DocumentStatus.FAILED)
+        raise HTTPException(status_code=503, detail="Processing queue unavailable") from exc
+
+
 @router.delete("/documents/{job_id}/cache", status_code=204)
 async def clear_cache(job_id: str, remove_original: bool = Query(False)) -> Response:
     job = await document_store.get_job(job_id)
@@ -102,12 +156,9 @@ async def clear_cache(job_id: str, remove_original: bool = Query(False)) -> Resp
         raise HTTPException(status_code=404, detail="Document not found")
 
     await asyncio.to_thread(storage.purge_job_cache, job_id, remove_original)
-    metadata = dict(job.metadata)
-    metadata.update({"cache_cleared": True})
+    job.metadata["cache_cleared"] = True
     if remove_original:
-        job_update = {"storage_uri": None, "metadata": metadata}
-    else:
-        job_update = {"metadata": metadata}
-    await document_store.upsert(job.model_copy(update=job_update))
-    logger.info("Cleared cache for job %s (remove_original=%s)", job_id, remove_original)
+        job.storage_uri = None
+    await document_store.upsert(job)
+    logger.info("Cleared cache for job {} (remove_original={})", job_id, remove_original)
     return Response(status_code=204)
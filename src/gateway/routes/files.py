@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from ..services import storage
+
+router = APIRouter(tags=["files"])
+
+
+@router.get("/files/{file_path:path}", include_in_schema=False)
+async def download_file(
+    file_path: str,
+    expires: int = Query(...),
+    signature: str = Query(...),
+) -> FileResponse:
+    """Serve artefacts (e.g. page images) referenced by signed attachment URLs."""
+    path = storage.resolve_presigned(file_path, expires, signature)
+    if path is None:
+        raise HTTPException(status_code=404, detail="File not found or link expired")
+    return FileResponse(path)
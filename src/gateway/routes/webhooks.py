@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from ..services import runpod_events
+
+router = APIRouter(tags=["webhooks"])
+
+
+@router.post("/webhooks/runpod", status_code=204, include_in_schema=False)
+async def runpod_webhook(request: Request, token: str = Query(...)) -> Response:
+    """Receive RunPod serverless job completions and hand them to the waiting worker."""
+    if not runpod_events.verify_token(token):
+        raise HTTPException(status_code=403, detail="Invalid webhook token")
+
+    # Completion callbacks carry the full job output; the raw body is relayed as-is, not re-encoded.
+    body = await request.body()
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Webhook payload is not valid JSON") from None
+    if not isinstance(payload, dict) or not payload.get("id"):
+        raise HTTPException(status_code=400, detail="Webhook payload missing job id")
+
+    await runpod_events.publish_job_status(payload, body)
+    return Response(status_code=204)
@@ -1,109 +1,345 @@
 from __future__ import annotations
 
-import base64
+import hashlib
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from io import BytesIO
 from math import sqrt
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterator, List, NamedTuple, Tuple
 
+import billiard
 from loguru import logger
 
+try:
+    import fitz
+except ImportError:  # pragma: no cover - checked by ensure_rasterizer_available()
+    fitz = None
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - checked by ensure_rasterizer_available()
+    Image = None
+
 from shared import get_settings
 from shared.schemas import Attachment, DocumentJob, LLMBatchRequest, LLMTaskPrompt, TaskType
 
-from . import storage
+from . import runpod_client, storage
 
 settings = get_settings()
 
 MAX_BODY_BYTES = 7 * 1024 * 1024  # keep comfortably below 10MiB serverless limit
+MAX_BATCH_PAYLOAD_BYTES = MAX_BODY_BYTES * 4 // 3  # base64 size of one maximum-size page
 MAX_IMAGE_PIXELS = 4_000_000
 INITIAL_JPEG_QUALITY = 85
 MIN_JPEG_QUALITY = 45
+JPEG_QUALITY_STEP = 5
+ENCODE_POOL_SIZE = min(8, os.cpu_count() or 1)
+
+# Encoder parameters are part of the page digest so tuning them never serves stale cached JPEGs.
+_PAGE_DIGEST_SALT = f"{INITIAL_JPEG_QUALITY}:{MIN_JPEG_QUALITY}:{JPEG_QUALITY_STEP}:{MAX_BODY_BYTES}".encode("ascii")
+
+# Shared pool for Pillow resize/encode work; libjpeg and Pillow's resampling release the GIL.
+_ENCODE_POOL = ThreadPoolExecutor(max_workers=ENCODE_POOL_SIZE, thread_name_prefix="page-encode")
+
 
+class _RenderedPage(NamedTuple):
+    filename: str
+    image_bytes: bytes
+    digest: str | None
 
-def rasterize_pdf(pdf_path: str, job_id: str) -> List[Attachment]:
+
+def ensure_rasterizer_available() -> None:
+    """Fail fast at worker start-up instead of on the first document when an imaging library is missing."""
+
+    if fitz is None:
+        raise RuntimeError("PyMuPDF (fitz) is required for rasterization.")
+    if Image is None:
+        raise RuntimeError("Pillow is required to process image uploads.")
+
+
+def rasterize_pdf(pdf_path: str, job_id: str, persist_to_disk: bool = False) -> List[Attachment]:
     """
-    Convert an uploaded document into page-level JPEG images and return them as inline attachments.
+    Convert an uploaded document into page-level JPEG images and return them as attachments.
+
+    Attachments carry the page JPEG (base64-encoded only when the request is serialised), or a
+    signed gateway URL when attachment URLs are configured.
+    Page images are only written to the job workspace when `persist_to_disk` is set or signed URLs
+    need a file to point at; inline attachments are built straight from memory.
 
     Returns a list of Attachment objects for downstream requests.
     """
 
-    logger.info("Rasterising PDF for job %s", job_id)
-    local_path = storage.download_to_workspace(pdf_path, job_id)
-    output_dir = storage.get_local_workspace(job_id) / "pages"
+    logger.info("Rasterising PDF for job {}", job_id)
+    output_dir: Path | None = None
+    if persist_to_disk or storage.presign_enabled():
+        output_dir = _pages_dir(job_id)
+
+    attachments: List[Attachment] = []
+    for index, page in enumerate(_render_document(pdf_path, job_id, output_dir)):
+        attachment = _build_attachment(page, output_dir)
+        attachments.append(attachment)
+        logger.debug(
+            "Rendered page {} -> {}",
+            index,
+            attachment.filename,
+        )
+
+    return attachments
 
+
+def rasterize_pdf_to_pages(pdf_path: str, job_id: str) -> List[str]:
+    """
+    Render the document into the job workspace and return the page image filenames, in page order.
+
+    Used when rasterisation and RunPod submission run as separate Celery tasks: only these names
+    cross the broker, and load_page_attachments() turns them into attachments on the other side.
+    """
+
+    logger.info("Rasterising PDF for job {} to disk", job_id)
+    return [page.filename for page in _render_document(pdf_path, job_id, _pages_dir(job_id))]
+
+
+def load_page_attachments(job_id: str, filenames: List[str]) -> List[Attachment]:
+    """Build attachments from page images previously written by rasterize_pdf_to_pages()."""
+
+    output_dir = _pages_dir(job_id)
+    return [
+        _build_attachment(_RenderedPage(filename, (output_dir / filename).read_bytes(), None), output_dir)
+        for filename in filenames
+    ]
+
+
+def _pages_dir(job_id: str) -> Path:
+    return storage.get_local_workspace(job_id) / "pages"
+
+
+def _render_document(pdf_path: str, job_id: str, output_dir: Path | None) -> List[_RenderedPage]:
+    local_path = storage.download_to_workspace(pdf_path, job_id)
     suffix = Path(local_path).suffix.lower()
     if suffix == ".pdf":
-        return _rasterize_pdf_document(local_path, output_dir)
+        return _render_pdf_document(local_path, output_dir)
     if suffix in {".png", ".jpg", ".jpeg", ".webp"}:
-        return _make_single_page_attachment(local_path, output_dir)
+        return _render_single_page(local_path, output_dir)
 
     raise RuntimeError(f"Unsupported document type: {suffix}")
 
 
-def _rasterize_pdf_document(local_pdf: Path, output_dir: Path) -> List[Attachment]:
-    try:
-        from pdf2image import convert_from_path
-    except ImportError as exc:
-        raise RuntimeError(
-            "pdf2image is required for rasterization. Ensure poppler is installed."
-        ) from exc
+def _render_pdf_document(local_pdf: Path, output_dir: Path | None) -> List[_RenderedPage]:
+    with fitz.open(str(local_pdf)) as document:
+        page_count = document.page_count
+
+    workers = _rasterize_worker_count(page_count)
+    if workers > 1:
+        logger.debug("Rasterising {} pages across {} worker processes", page_count, workers)
+        # Each worker gets one contiguous page range, so it opens the document once.
+        chunk_size = -(-page_count // workers)
+        page_ranges = [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+        render_range = partial(_render_page_range, str(local_pdf), dpi=settings.page_image_dpi)
+        # Processes come from billiard (Celery's multiprocessing fork): the stdlib refuses to start
+        # children from a daemonic process, which every Celery prefork child is.
+        with ProcessPoolExecutor(max_workers=len(page_ranges), mp_context=billiard.get_context()) as executor:
+            # Workers only render and encode; page writes run on the encode pool so the disk I/O
+            # for finished ranges overlaps the encoding of later ones.
+            writes = [
+                _ENCODE_POOL.submit(_store_page, image_bytes, output_dir, index, digest)
+                for (start, _), pages in zip(page_ranges, executor.map(render_range, page_ranges))
+                for index, (digest, image_bytes) in enumerate(pages, start)
+            ]
+        return [write.result() for write in writes]
+    return _render_pages_inline(local_pdf, output_dir)
+
+
+def _rasterize_worker_count(page_count: int) -> int:
+    return max(1, min(os.cpu_count() or 1, settings.max_concurrent_pages, page_count))
+
+
+def _render_page_range(pdf_path: str, page_range: Tuple[int, int], *, dpi: int) -> List[Tuple[str | None, bytes]]:
+    """
+    Render and compress pages [start, stop), returning each page's pixel digest (None without the
+    page cache) and JPEG bytes.
 
-    images = convert_from_path(str(local_pdf), dpi=settings.page_image_dpi)
-    attachments: List[Attachment] = []
-    for index, image in enumerate(images):
-        attachment = _build_attachment(image, output_dir, index)
-        attachments.append(attachment)
-        logger.debug(
-            "Rendered page %s -> %s (inline attachment)",
-            index,
-            attachment.filename,
+    Runs inside the rasterization worker processes, each with its own document handle.
+    """
+
+    with fitz.open(pdf_path) as document:
+        return [_render_page(document[page_index], page_index, dpi) for page_index in range(*page_range)]
+
+
+def _render_page(page, page_index: int, dpi: int) -> Tuple[str | None, bytes]:
+    pixmap = _render_pixmap(page, dpi)
+    digest = _pixmap_digest(pixmap)
+    cached = storage.read_cached_page(digest) if digest is not None else None
+    if cached is not None:
+        return digest, cached
+    if pixmap.width * pixmap.height <= MAX_IMAGE_PIXELS:
+        return digest, _encode_pixmap(pixmap, page_index)
+    return digest, _encode_page(_pixmap_to_image(pixmap), page_index)
+
+
+def _render_pages_inline(local_pdf: Path, output_dir: Path | None) -> List[_RenderedPage]:
+    """
+    Render pages on the calling thread while the shared encode pool JPEG-encodes earlier pages.
+
+    PyMuPDF is not thread-safe, so only rendering (and copying the samples into a Pillow image)
+    happens on this thread; the Pillow JPEG encode, which releases the GIL, and the disk writes
+    run on the pool and overlap the rendering of later pages.
+    """
+
+    futures: List[Future[_RenderedPage]] = []
+    with fitz.open(str(local_pdf)) as document:
+        for index, page in enumerate(document):
+            pixmap = _render_pixmap(page, settings.page_image_dpi)
+            digest = _pixmap_digest(pixmap)
+            image_bytes = storage.read_cached_page(digest) if digest is not None else None
+            if image_bytes is not None:
+                futures.append(_ENCODE_POOL.submit(_store_page, image_bytes, output_dir, index, digest))
+            else:
+                image = _pixmap_to_image(pixmap)
+                futures.append(_ENCODE_POOL.submit(_encode_and_store_page, image, output_dir, index, digest))
+            # Bound the number of decoded page images held in memory at once.
+            if index >= ENCODE_POOL_SIZE:
+                futures[index - ENCODE_POOL_SIZE].result()
+
+    return [future.result() for future in futures]
+
+
+def _render_pixmap(page, dpi: int):
+    """
+    Render a page in-process straight to an RGB pixmap (no Poppler subprocess or PPM temp files).
+
+    Oversized sheets are rendered at a reduced zoom so they land inside MAX_IMAGE_PIXELS
+    without a separate resample pass.
+    """
+
+    zoom = dpi / 72
+    rendered_pixels = page.rect.width * page.rect.height * zoom * zoom
+    if rendered_pixels > MAX_IMAGE_PIXELS:
+        # Leave a little headroom for the outward rounding of the pixmap bounds.
+        clamped_zoom = zoom * sqrt(MAX_IMAGE_PIXELS / rendered_pixels) * 0.995
+        logger.warning(
+            "Rendering page {} at {:.0f} dpi instead of {} dpi to meet size limits",
+            page.number,
+            clamped_zoom * 72,
+            dpi,
         )
+        zoom = clamped_zoom
+    return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+
+
+def _pixmap_digest(pixmap) -> str | None:
+    """
+    Content address for a rendered page: identical pixels (repeat jobs, blank or duplicate sheets)
+    map to the same JPEG, so the encode work can be reused.
+
+    The page cache is the only consumer, so without it the (full-pixmap) hash is skipped and None
+    is returned.
+    """
+
+    if not settings.page_cache_enabled:
+        return None
+    digest = hashlib.blake2b(_PAGE_DIGEST_SALT, digest_size=16)
+    digest.update(f"{pixmap.width}x{pixmap.height}".encode("ascii"))
+    digest.update(pixmap.samples_mv)
+    return digest.hexdigest()
 
-    return attachments
 
+def _pixmap_to_image(pixmap):
+    # frombytes copies out of the memoryview, so the image stays valid once the pixmap is freed.
+    return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples_mv)
 
-def _make_single_page_attachment(source_path: Path, output_dir: Path) -> List[Attachment]:
-    logger.debug("Wrapping image %s as single-page attachment", source_path.name)
-    try:
-        from PIL import Image
-    except ImportError as exc:
-        raise RuntimeError("Pillow is required to process image uploads.") from exc
 
+def _render_single_page(source_path: Path, output_dir: Path | None) -> List[_RenderedPage]:
+    logger.debug("Wrapping image {} as single-page attachment", source_path.name)
     image = Image.open(source_path)
-    attachment = _build_attachment(image, output_dir, page_index=0)
-    return [attachment]
+    return [_encode_and_store_page(image, output_dir, page_index=0)]
 
 
-def _build_attachment(image, output_dir: Path, page_index: int) -> Attachment:
-    from PIL import Image
+def _encode_pixmap(pixmap, page_index: int) -> bytes:
+    # MuPDF encodes the rendered RGB samples directly, skipping the Pillow copy entirely.
+    return _compress(lambda quality: pixmap.tobytes(output="jpeg", jpg_quality=quality), page_index)
+
 
+def _encode_page(image, page_index: int) -> bytes:
+    # Palette and greyscale pages are converted once up front; RGB and RGBA pass through untouched.
     if image.mode not in {"RGB", "RGBA"}:
         image = image.convert("RGB")
 
     image = _clamp_image_dimensions(image)
+    return _compress(partial(_encode_image, image), page_index)
 
-    quality = INITIAL_JPEG_QUALITY
-    image_bytes = _encode_image(image, quality)
 
-    while len(image_bytes) > MAX_BODY_BYTES and quality > MIN_JPEG_QUALITY:
-        quality = max(MIN_JPEG_QUALITY, quality - 10)
-        image_bytes = _encode_image(image, quality)
+def _encode_and_store_page(
+    image,
+    output_dir: Path | None,
+    page_index: int,
+    digest: str | None = None,
+) -> _RenderedPage:
+    return _store_page(_encode_page(image, page_index), output_dir, page_index, digest)
 
-    if len(image_bytes) > MAX_BODY_BYTES:
-        raise RuntimeError(
-            f"Attachment for page {page_index} still exceeds size limit after compression "
-            f"({len(image_bytes)} bytes)"
-        )
 
+def _compress(encode: Callable[[int], bytes], page_index: int) -> bytes:
+    """
+    Encode at the highest quality (in JPEG_QUALITY_STEP increments) whose output fits MAX_BODY_BYTES.
+
+    JPEG size grows monotonically with quality, so oversize pages are bisected between
+    MIN_JPEG_QUALITY and the too-large INITIAL_JPEG_QUALITY instead of stepping down linearly.
+    """
+
+    image_bytes = encode(INITIAL_JPEG_QUALITY)
+    if len(image_bytes) <= MAX_BODY_BYTES:
+        return image_bytes
+
+    best: bytes | None = None
+    low, high = MIN_JPEG_QUALITY, INITIAL_JPEG_QUALITY  # `high` is known to be too large
+    while high - low > JPEG_QUALITY_STEP:
+        quality = low + (high - low) // (2 * JPEG_QUALITY_STEP) * JPEG_QUALITY_STEP
+        candidate = encode(quality)
+        if len(candidate) <= MAX_BODY_BYTES:
+            low, best = quality, candidate
+        else:
+            high = quality
+
+    if best is None:
+        best = encode(MIN_JPEG_QUALITY)
+        if len(best) > MAX_BODY_BYTES:
+            raise RuntimeError(
+                f"Attachment for page {page_index} still exceeds size limit after compression "
+                f"({len(best)} bytes)"
+            )
+    return best
+
+
+def _store_page(
+    image_bytes: bytes,
+    output_dir: Path | None,
+    page_index: int,
+    digest: str | None = None,
+) -> _RenderedPage:
     filename = f"page-{page_index:04d}.jpg"
-    image_path = output_dir / filename
-    storage.write_bytes(image_path, image_bytes)
+    if output_dir is not None:
+        storage.write_bytes(output_dir / filename, image_bytes)
+    if digest is not None:
+        storage.write_cached_page(digest, image_bytes)
+    return _RenderedPage(filename, image_bytes, digest)
+
+
+def _build_attachment(page: _RenderedPage, output_dir: Path | None) -> Attachment:
+    if output_dir is not None and storage.presign_enabled():
+        # The worker fetches the page from the gateway, so the payload skips the base64 expansion.
+        return Attachment(
+            filename=page.filename,
+            content_type="image/jpeg",
+            data_url=storage.presign(output_dir / page.filename),
+        )
 
-    return Attachment(
-        filename=filename,
-        content_type="image/jpeg",
-        data_base64=base64.b64encode(image_bytes).decode("ascii"),
+    # Only the JPEG bytes are held; base64 is produced once, when the request body is serialised.
+    return Attachment.from_bytes(
+        page.filename,
+        "image/jpeg",
+        page.image_bytes,
+        inline=not runpod_client.binary_attachments_enabled(),
     )
 
 
@@ -116,24 +352,54 @@ def _clamp_image_dimensions(image):
     scale = sqrt(MAX_IMAGE_PIXELS / total_pixels)
     new_size = (max(1, int(width * scale)), max(1, int(height * scale)))
 
-    from PIL import Image
-
     logger.warning(
-        "Downscaling image from %sx%s to %sx%s to meet size limits",
+        "Downscaling image from {}x{} to {}x{} to meet size limits",
         width,
         height,
         new_size[0],
         new_size[1],
     )
-    return image.resize(new_size, Image.Resampling.LANCZOS).convert("RGB")
+    # resize() preserves the mode, so only RGBA input still needs a conversion afterwards.
+    resized = image.resize(new_size, Image.Resampling.LANCZOS)
+    return resized if resized.mode == "RGB" else resized.convert("RGB")
 
 
 def _encode_image(image, quality: int) -> bytes:
+    # optimize=True runs a second Huffman pass that roughly doubles encode time for ~2% smaller files.
     buffer = BytesIO()
-    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    image.save(buffer, format="JPEG", quality=quality)
     return buffer.getvalue()
 
 
+BASE_PROMPTS = {
+    TaskType.LAYOUT: (
+        "Analyze the architectural floor plan image and describe the primary layout "
+        "elements including walls, structural grids, circulation paths, and key symbols. "
+        "Return JSON with 'layout', 'symbols', and 'notes' arrays."
+    ),
+    TaskType.ROOMS: (
+        "Extract every room with name, usage, area, and bounding polygon. "
+        "Respond in JSON: {\"rooms\": [{\"name\": str, \"area\": float, "
+        "\"level\": str | null, \"polygon\": [[x, y], ...]]}]. Coordinates normalised 0-1."
+    ),
+    TaskType.ANNOTATIONS: (
+        "List dimensions, annotations, and legend items along with their coordinates. "
+        "Return JSON with 'dimensions' and 'annotations' arrays."
+    ),
+    TaskType.QA: (
+        "Evaluate the plan for basic code compliance and QA rules provided in the context. "
+        "Output JSON {\"qa_results\": [{\"rule\": str, \"severity\": str, \"message\": str}]}."
+    ),
+    TaskType.COMPARE: (
+        "Compare the supplied plan with context drawings and summarise differences. "
+        "Output JSON {\"diffs\": [{\"description\": str, \"severity\": str}]}."
+    ),
+}
+
+# Prompts are identical for every page, so validate them once at import time.
+_TASK_PROMPTS = {task: LLMTaskPrompt(task=task, prompt=prompt) for task, prompt in BASE_PROMPTS.items()}
+
+
 def build_llm_requests(job: DocumentJob, attachments: List[Attachment]) -> List[LLMBatchRequest]:
     """
     Create structured prompts for Qwen based on the job's requested tasks.
@@ -144,56 +410,84 @@ def build_llm_requests(job: DocumentJob, attachments: List[Attachment]) -> List[
         logger.warning("Job {} has no tasks configured, skipping prompt build", job.id)
         return requests
 
-    base_prompts = {
-        TaskType.LAYOUT: (
-            "Analyze the architectural floor plan image and describe the primary layout "
-            "elements including walls, structural grids, circulation paths, and key symbols. "
-            "Return JSON with 'layout', 'symbols', and 'notes' arrays."
-        ),
-        TaskType.ROOMS: (
-            "Extract every room with name, usage, area, and bounding polygon. "
-            "Respond in JSON: {\"rooms\": [{\"name\": str, \"area\": float, "
-            "\"level\": str | null, \"polygon\": [[x, y], ...]]}]. Coordinates normalised 0-1."
-        ),
-        TaskType.ANNOTATIONS: (
-            "List dimensions, annotations, and legend items along with their coordinates. "
-            "Return JSON with 'dimensions' and 'annotations' arrays."
-        ),
-        TaskType.QA: (
-            "Evaluate the plan for basic code compliance and QA rules provided in the context. "
-            "Output JSON {\"qa_results\": [{\"rule\": str, \"severity\": str, \"message\": str}]}."
-        ),
-        TaskType.COMPARE: (
-            "Compare the supplied plan with context drawings and summarise differences. "
-            "Output JSON {\"diffs\": [{\"description\": str, \"severity\": str}]}."
-        ),
-    }
-
-    for page_index, attachment in enumerate(attachments):
-        prompts: List[LLMTaskPrompt] = []
-        for task in job.tasks:
-            prompt = base_prompts.get(task)
-            if not prompt:
-                logger.warning("No prompt template for task {}", task)
-                continue
-            prompts.append(LLMTaskPrompt(task=task, prompt=prompt))
-
-        if not prompts:
+    prompts: List[LLMTaskPrompt] = []
+    for task in job.tasks:
+        prompt = _TASK_PROMPTS.get(task)
+        if prompt is None:
+            logger.warning("No prompt template for task {}", task)
             continue
+        prompts.append(prompt)
+
+    if not prompts:
+        return requests
 
+    context = {"filename": job.filename}
+    task_names = [prompt.task for prompt in prompts]
+    for page_indices, page_attachments in _batch_pages(attachments):
         request = LLMBatchRequest(
             document_id=job.id,
-            page_indices=[page_index],
+            page_indices=page_indices,
             tasks=prompts,
-            attachments=[attachment],
-            context={"filename": job.filename},
+            attachments=page_attachments,
+            context=context,
         )
         requests.append(request)
         logger.debug(
-            "Prepared multi-task LLM request for job {} page {} tasks {}",
+            "Prepared multi-task LLM request for job {} pages {} tasks {}",
             job.id,
-            page_index,
-            [task.task for task in prompts],
+            page_indices,
+            task_names,
         )
 
     return requests
+
+
+def _batch_pages(attachments: List[Attachment]) -> Iterator[Tuple[List[int], List[Attachment]]]:
+    """
+    Group consecutive pages into requests of up to `page_batch_size` pages (no page cap when it is 0).
+
+    A batch is also closed early once its inline payload would exceed MAX_BATCH_PAYLOAD_BYTES, so
+    multi-page requests stay under the serverless body limit; a single page always fits on its own.
+    With signed attachment URLs the payload is tiny, so an uncapped document goes out as one job.
+    """
+
+    batch_size = settings.page_batch_size if settings.page_batch_size > 0 else max(1, len(attachments))
+    page_indices: List[int] = []
+    batch: List[Attachment] = []
+    batch_bytes = 0
+    # Identical pages (blank sheets, repeated title blocks) within a batch are sent as a reference
+    # to the first copy.
+    first_copy: dict[str | bytes, str] = {}
+    for page_index, attachment in enumerate(attachments):
+        data = _inline_data(attachment)
+        attachment_bytes = 0 if data is None or data in first_copy else attachment.inline_size
+        if batch and (len(batch) >= batch_size or batch_bytes + attachment_bytes > MAX_BATCH_PAYLOAD_BYTES):
+            yield page_indices, batch
+            page_indices, batch, batch_bytes = [], [], 0
+            first_copy = {}
+            attachment_bytes = attachment.inline_size
+        if data is not None:
+            if data in first_copy:
+                attachment = Attachment(
+                    filename=attachment.filename,
+                    content_type=attachment.content_type,
+                    content_ref=first_copy[data],
+                )
+            else:
+                first_copy[data] = attachment.filename
+        page_indices.append(page_index)
+        batch.append(attachment)
+        batch_bytes += attachment_bytes
+
+    if batch:
+        yield page_indices, batch
+
+
+def _inline_data(attachment: Attachment) -> str | bytes | None:
+    """The payload an attachment embeds in the JSON body, used to spot duplicate pages."""
+
+    if attachment.data_base64 is not None:
+        return attachment.data_base64
+    if attachment.is_binary:
+        return None
+    return attachment.content
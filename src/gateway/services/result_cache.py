@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import hashlib
+from typing import List, Mapping, Sequence
+
+from loguru import logger
+from pydantic import TypeAdapter, ValidationError
+from redis import RedisError
+from redis import asyncio as aioredis
+
+from shared import get_settings
+from shared.schemas import LLMBatchRequest, LLMResponse, LLMTaskPrompt
+
+settings = get_settings()
+
+_RESPONSES_ADAPTER = TypeAdapter(List[LLMResponse])
+
+_redis: aioredis.Redis | None = None
+
+
+def cache_enabled() -> bool:
+    return settings.runpod_result_cache_ttl_seconds > 0
+
+
+def task_keys(request: LLMBatchRequest) -> List[bytes] | None:
+    """
+    Cache key of each task prompt in the request, in task order.
+
+    A key covers only what determines the model output: the task, its prompt and the page image
+    bytes (plus the model version, see _result_key). Document ids, filenames and page numbers are
+    left out, so a re-upload of an unchanged drawing hits the cache. Returns None when a page is
+    only reachable through a signed URL, whose content is not known here.
+    """
+
+    pages = hashlib.sha256()
+    page_hashes: dict[str, bytes] = {}
+    for attachment in request.attachments:
+        if attachment.content_ref:
+            page_hash = page_hashes.get(attachment.content_ref)
+        elif attachment.content is not None:
+            page_hash = hashlib.sha256(attachment.content).digest()
+        elif attachment.data_base64 is not None:
+            page_hash = hashlib.sha256(attachment.data_base64.encode("ascii")).digest()
+        else:
+            page_hash = None
+        if page_hash is None:
+            return None
+        page_hashes[attachment.filename] = page_hash
+        pages.update(page_hash)
+
+    pages_digest = pages.digest()
+    return [_task_key(task_prompt, pages_digest) for task_prompt in request.tasks]
+
+
+async def load(digests: Sequence[bytes]) -> List[List[LLMResponse] | None]:
+    """Return the responses recorded for each key, None where there is no usable entry."""
+
+    try:
+        raw_entries = await _get_redis().mget([_result_key(digest) for digest in digests])
+    except RedisError as exc:
+        logger.warning("RunPod result cache lookup failed: {}", exc)
+        return [None] * len(digests)
+
+    results: List[List[LLMResponse] | None] = []
+    for raw in raw_entries:
+        responses = None
+        if raw is not None:
+            try:
+                responses = _RESPONSES_ADAPTER.validate_json(raw)
+            except ValidationError as exc:
+                # Written by an older schema under the same MODEL_VERSION; recomputed and overwritten.
+                logger.warning("Ignoring unreadable RunPod result cache entry ({} validation errors)", exc.error_count())
+        results.append(responses)
+    return results
+
+
+async def store(entries: Mapping[bytes, List[LLMResponse]]) -> None:
+    try:
+        async with _get_redis().pipeline(transaction=False) as pipe:
+            for digest, responses in entries.items():
+                pipe.set(
+                    _result_key(digest),
+                    _RESPONSES_ADAPTER.dump_json(responses),
+                    ex=settings.runpod_result_cache_ttl_seconds,
+                )
+            await pipe.execute()
+    except RedisError as exc:
+        logger.warning("RunPod result cache write failed: {}", exc)
+
+
+async def close() -> None:
+    global _redis
+
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+def _get_redis() -> aioredis.Redis:
+    global _redis
+
+    if _redis is None:
+        _redis = aioredis.from_url(settings.redis_url)
+    return _redis
+
+
+def _task_key(task_prompt: LLMTaskPrompt, pages_digest: bytes) -> bytes:
+    task = f"{task_prompt.task.value}\0{task_prompt.prompt}".encode("utf-8")
+    return hashlib.sha256(pages_digest + task).digest()
+
+
+def _result_key(digest: bytes) -> str:
+    # The model version is part of the key, so deploying a new model invalidates every entry.
+    return f"runpod:result:{settings.model_version}:{digest.hex()}"
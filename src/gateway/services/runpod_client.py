@@ -1,31 +1,87 @@
 from __future__ import annotations
 
 import asyncio
-import time
+import hashlib
+import random
+import ssl
+from functools import lru_cache
 from typing import Iterable, List
 
+import certifi
 import httpx
+import orjson
+from httpx._utils import get_environment_proxies
 from loguru import logger
 
 from shared import get_settings
 from shared.schemas import LLMBatchRequest, LLMResponse, TaskType
 
+from . import result_cache, runpod_events
+
 settings = get_settings()
 
+# Bodies are serialised with orjson and sent as raw content, so httpx does not re-encode them.
+_JSON_CONTENT_TYPE = {"Content-Type": "application/json"}
+
+_STATUS_COMPLETED = "COMPLETED"
+_STATUS_FAILED = frozenset({"FAILED", "CANCELLED"})
+_TRANSIENT_HTTP_STATUSES = frozenset({429, 500, 502, 503, 504})
+# A job POST is only repeated when RunPod certainly did not accept it; after a 500/502/504 the job may
+# already be queued, and resubmitting would run (and bill) it twice.
+_RETRYABLE_SUBMIT_STATUSES = frozenset({429, 503})
+_ERROR_PREVIEW_BYTES = 1000
+_TASK_BY_VALUE: dict[str, TaskType] = {task.value: task for task in TaskType}
+
+
+def is_serverless_endpoint(endpoint: str) -> bool:
+    return "api.runpod.ai" in endpoint
+
+
+def binary_attachments_enabled() -> bool:
+    """Whether page images should be handed over as raw bytes for a multipart /analyze upload."""
+
+    # RunPod serverless only accepts JSON job input, so the flag only applies to a dedicated worker.
+    return settings.runpod_multipart_uploads and not is_serverless_endpoint(settings.runpod_endpoint)
+
 
 class RunPodClient:
     """Thin HTTP client used to communicate with the Qwen inference worker."""
 
-    def __init__(self, endpoint: str | None = None, api_key: str | None = None) -> None:
+    # Connection pools shared by every instance talking to the same endpoint. httpx clients are
+    # bound to the event loop they first ran on, so owners must call shutdown() before that loop closes
+    # (the Celery worker does so on process shutdown).
+    _shared_clients: dict[str, httpx.AsyncClient] = {}
+
+    def __init__(
+        self,
+        endpoint: str | None = None,
+        api_key: str | None = None,
+        http_client: httpx.AsyncClient | None = None,
+    ) -> None:
         configured_endpoint = (endpoint or settings.runpod_endpoint).rstrip("/")
-        if configured_endpoint.endswith("/run") and "api.runpod.ai" in configured_endpoint:
+        if configured_endpoint.endswith("/run") and is_serverless_endpoint(configured_endpoint):
             configured_endpoint = configured_endpoint[: -len("/run")]
         self._endpoint = configured_endpoint
         self._api_key = api_key or settings.runpod_api_key
-        self._client = httpx.AsyncClient(base_url=self._endpoint, timeout=120.0)
-        self._is_serverless = "api.runpod.ai" in self._endpoint
+        self._log = logger.bind(endpoint=self._endpoint)
+        # Built once per client; the shared pool is keyed by endpoint only, so auth stays per request.
+        self._auth_headers = {"Authorization": f"Bearer {self._api_key}"} if self._api_key else {}
+        self._json_headers = {**self._auth_headers, **_JSON_CONTENT_TYPE}
+        # An injected client (e.g. one with a mock transport) is owned by the caller and never
+        # closed here; otherwise the endpoint's shared pool is used.
+        self._client = http_client or self._get_shared_client(self._endpoint)
+        self._is_serverless = is_serverless_endpoint(self._endpoint)
         self._timeout_seconds = max(0, settings.runpod_serverless_timeout_seconds)
         self._poll_interval = max(0.2, settings.runpod_poll_interval_seconds)
+        self._poll_backoff_factor = max(1.0, settings.runpod_poll_backoff_factor)
+        self._poll_max_interval = max(self._poll_interval, settings.runpod_poll_max_interval)
+        self._use_runsync = settings.runpod_use_runsync
+        self._sync_tasks = frozenset(settings.runpod_sync_tasks)
+        self._sync_wait_seconds = max(1.0, settings.runpod_sync_wait_seconds)
+        # Shared by every submit_batch call on this client, so overlapping batches respect one cap.
+        self._batch_semaphore = asyncio.Semaphore(max(1, settings.runpod_batch_concurrency))
+        self._inflight: dict[bytes, _InflightRequest] = {}
+        self._status_poller = _StatusPoller(self._client, self._auth_headers, tick=self._poll_interval)
 
     async def __aenter__(self) -> "RunPodClient":
         return self
@@ -34,124 +90,371 @@ class RunPodClient:
         await self.close()
 
     async def close(self) -> None:
-        await self._client.aclose()
+        # The underlying pool outlives this instance; see shutdown().
+        self._status_poller.close()
+
+    @classmethod
+    def _get_shared_client(cls, endpoint: str) -> httpx.AsyncClient:
+        client = cls._shared_clients.get(endpoint)
+        if client is None or client.is_closed:
+            # Pool settings live on the transport, which also retries failed connection attempts.
+            transport_options = {
+                "verify": _ssl_context(),
+                # Concurrent submits and status polls multiplex over one connection where ALPN allows.
+                "http2": True,
+                "limits": httpx.Limits(
+                    max_connections=settings.httpx_max_connections,
+                    max_keepalive_connections=settings.httpx_max_keepalive,
+                    keepalive_expiry=settings.httpx_keepalive_expiry,
+                ),
+                "retries": 2,
+            }
+            mounts = None
+            if settings.httpx_trust_env:
+                # httpx ignores proxy variables once an explicit transport is passed, so the
+                # environment's proxies are mounted here with the same pool settings.
+                mounts = {
+                    pattern: httpx.AsyncHTTPTransport(proxy=proxy, **transport_options) if proxy else None
+                    for pattern, proxy in get_environment_proxies().items()
+                }
+            client = httpx.AsyncClient(
+                base_url=endpoint,
+                transport=httpx.AsyncHTTPTransport(**transport_options),
+                mounts=mounts,
+                trust_env=settings.httpx_trust_env,
+                timeout=httpx.Timeout(connect=5.0, read=120.0, write=60.0, pool=5.0),
+            )
+            cls._shared_clients[endpoint] = client
+        return client
 
-    async def submit(self, request: LLMBatchRequest) -> List[LLMResponse]:
-        if self._is_serverless:
-            return await self._submit_serverless(request)
+    @classmethod
+    async def shutdown(cls) -> None:
+        """Close every shared connection pool."""
 
-        headers = {}
-        if self._api_key:
-            headers["Authorization"] = f"Bearer {self._api_key}"
+        clients = list(cls._shared_clients.values())
+        cls._shared_clients.clear()
+        for client in clients:
+            await client.aclose()
 
-        logger.info(
-            "Submitting request to RunPod: doc=%s tasks=%s pages=%s",
-            request.document_id,
-            [task.task for task in request.tasks],
-            request.page_indices,
-        )
+    async def submit(self, request: LLMBatchRequest) -> List[LLMResponse]:
+        # Serialised straight to JSON bytes once; retries, dedup keys and the serverless envelope
+        # all reuse them instead of walking the model (and its base64 attachments) again.
+        content = request.__pydantic_serializer__.to_json(request)
+
+        # Identical requests already in flight (e.g. retry races) share one RunPod round trip; the
+        # result cache (see _dispatch_cached) is keyed separately, by task and page content.
+        digest = hashlib.blake2b(content, digest_size=16)
+        for attachment in request.attachments:
+            if attachment.is_binary:
+                digest.update(attachment.content)
+        key = digest.digest()
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = _InflightRequest(asyncio.create_task(self._dispatch_cached(request, content)))
+            self._inflight[key] = inflight
+            inflight.task.add_done_callback(lambda _: self._forget_inflight(key, inflight))
+        else:
+            self._log.debug("Joining in-flight RunPod request for job {}", request.document_id)
 
-        response = await self._client.post(
-            "/analyze",
-            json=request.model_dump(mode="json"),
-            headers=headers,
+        # Shielded so one caller giving up does not cancel the request for the others; once the
+        # last caller is gone the request itself is cancelled rather than left running unobserved.
+        inflight.waiters += 1
+        try:
+            return list(await asyncio.shield(inflight.task))
+        finally:
+            inflight.waiters -= 1
+            if inflight.waiters == 0 and not inflight.task.done():
+                self._forget_inflight(key, inflight)
+                inflight.task.cancel()
+                # Let it unwind (status listeners, pending polls) before the caller sees the cancellation.
+                await asyncio.wait([inflight.task])
+
+    def _forget_inflight(self, key: bytes, inflight: "_InflightRequest") -> None:
+        # A cancelled request may finish unwinding after a fresh one took over its key.
+        if self._inflight.get(key) is inflight:
+            del self._inflight[key]
+
+    async def _dispatch_cached(self, request: LLMBatchRequest, content: bytes) -> List[LLMResponse]:
+        keys = result_cache.task_keys(request) if result_cache.cache_enabled() else None
+        if not keys:
+            return await self._dispatch(request, content)
+
+        # Results are cached per task and page content, so a re-upload of an unchanged drawing is
+        # served entirely from Redis and a QA re-trigger only sends the tasks that are new.
+        tasks = request.tasks
+        per_task = await result_cache.load(keys)
+        missing = [index for index, responses in enumerate(per_task) if responses is None]
+        if len(missing) < len(tasks):
+            self._log.info(
+                "Reusing cached RunPod results for {} of {} tasks of job {}",
+                len(tasks) - len(missing),
+                len(tasks),
+                request.document_id,
+            )
+            # Entries may have been recorded for another job.
+            per_task = [
+                None
+                if responses is None
+                else [response.model_copy(update={"document_id": request.document_id}) for response in responses]
+                for responses in per_task
+            ]
+        if not missing:
+            return [response for responses in per_task for response in responses]
+
+        if len(missing) < len(tasks):
+            request = request.model_copy(update={"tasks": [tasks[index] for index in missing]})
+            content = request.__pydantic_serializer__.to_json(request)
+        responses = await self._dispatch(request, content)
+
+        by_task: dict[TaskType, List[LLMResponse]] = {}
+        for response in responses:
+            by_task.setdefault(response.task, []).append(response)
+        fresh = {keys[index]: by_task.get(tasks[index].task, []) for index in missing}
+        await result_cache.store(fresh)
+        if len(missing) == len(tasks):
+            return responses
+        for index in missing:
+            per_task[index] = fresh[keys[index]]
+        return [response for responses in per_task for response in responses]
+
+    async def _dispatch(self, request: LLMBatchRequest, content: bytes) -> List[LLMResponse]:
+        if self._is_serverless:
+            return await self._submit_serverless(request, content)
+
+        self._log.opt(lazy=True).info(
+            "Submitting request to RunPod: doc={} tasks={} pages={}",
+            lambda: request.document_id,
+            lambda: [task.task for task in request.tasks],
+            lambda: request.page_indices,
         )
-        self._ensure_success(response, request, action="POST /analyze")
 
-        payload = response.json()
+        # Multi-page OCR output can be large: read it chunk by chunk into one growing buffer rather
+        # than letting httpx keep the chunk list and a joined copy alive at the same time.
+        binary_parts = [
+            ("attachments", (attachment.filename, attachment.content, attachment.content_type))
+            for attachment in request.attachments
+            if attachment.is_binary
+        ]
+        if binary_parts:
+            # Page images travel as raw multipart parts next to the JSON metadata, skipping base64.
+            path = "/analyze/multipart"
+            body_kwargs = {"data": {"meta": content.decode()}, "files": binary_parts, "headers": self._auth_headers}
+        else:
+            path = "/analyze"
+            body_kwargs = {"content": content, "headers": self._json_headers}
+
+        body = bytearray()
+        async with self._client.stream("POST", path, **body_kwargs) as response:
+            if response.is_error:
+                await response.aread()
+                self._ensure_success(response, request, action=f"POST {path}")
+            async for chunk in response.aiter_bytes():
+                body.extend(chunk)
+
+        payload = orjson.loads(body)
+        del body
         return self._build_responses(payload, request)
 
     async def submit_batch(self, requests: Iterable[LLMBatchRequest]) -> List[LLMResponse]:
+        async def _run(request: LLMBatchRequest) -> List[LLMResponse]:
+            async with self._batch_semaphore:
+                try:
+                    return await self.submit(request)
+                except Exception:
+                    self._log.exception("RunPod request failed for job {}", request.document_id)
+                    raise
+
+        # The task group cancels the remaining requests as soon as one fails (submit() then cancels
+        # the RunPod call itself unless another caller still waits on it); the first failure is
+        # re-raised on its own so callers keep seeing the original exception type.
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [group.create_task(_run(request)) for request in requests]
+        except BaseExceptionGroup as failures:
+            raise failures.exceptions[0] from None
+
+        # Tasks are kept in input order, so responses line up with the sequential behaviour.
         results: List[LLMResponse] = []
-        for request in requests:
-            try:
-                result = await self.submit(request)
-                results.extend(result)
-            except Exception as exc:
-                logger.exception("RunPod request failed for job %s", request.document_id)
-                raise
+        for task in tasks:
+            results.extend(task.result())
         return results
 
-    async def _submit_serverless(self, request: LLMBatchRequest) -> List[LLMResponse]:
-        headers = {}
-        if self._api_key:
-            headers["Authorization"] = f"Bearer {self._api_key}"
-
-        payload = request.model_dump(mode="json")
-        logger.info(
-            "Submitting serverless RunPod request: doc=%s tasks=%s pages=%s",
-            request.document_id,
-            [task.task for task in request.tasks],
-            request.page_indices,
-        )
-        response = await self._client.post(
-            "/run",
-            json={"input": payload},
-            headers=headers,
+    async def _submit_serverless(self, request: LLMBatchRequest, content: bytes) -> List[LLMResponse]:
+        self._log.opt(lazy=True).info(
+            "Submitting serverless RunPod request: doc={} tasks={} pages={}",
+            lambda: request.document_id,
+            lambda: [task.task for task in request.tasks],
+            lambda: request.page_indices,
         )
-        self._ensure_success(response, request, action="POST /run")
-        job_info = response.json()
+        # The already serialised request is spliced into the job envelope rather than re-encoded.
+        body = b'{"input":' + content
+        use_webhook = runpod_events.webhook_enabled()
+        if use_webhook:
+            body += b',"webhook":' + orjson.dumps(runpod_events.webhook_url())
+        body += b"}"
+
+        # One deadline covers submission and completion, so a long /runsync wait (plus its retries)
+        # counts against RUNPOD_SERVERLESS_TIMEOUT_SECONDS instead of preceding it.
+        deadline = asyncio.get_running_loop().time() + self._timeout_seconds if self._timeout_seconds else None
+
+        # /runsync holds the call open until the job finishes (or the wait elapses), so jobs that
+        # finish within the wait need no status polls at all.
+        use_sync = self._is_sync_request(request)
+        try:
+            async with asyncio.timeout_at(deadline):
+                if use_sync:
+                    response = await self._post_job(
+                        "/runsync",
+                        body,
+                        request,
+                        params={"wait": int(self._sync_wait_seconds * 1000)},
+                        timeout=httpx.Timeout(self._sync_wait_seconds + 10.0, connect=10.0),
+                    )
+                else:
+                    response = await self._post_job("/run", body, request)
+        except TimeoutError:
+            raise RuntimeError(self._timeout_message(request, job_id=None)) from None
+        job_info = orjson.loads(response.content)
         job_id = job_info.get("id")
         if not job_id:
             raise RuntimeError("RunPod response missing job id")
 
-        poll_attempts = 0
-        deadline = time.monotonic() + self._timeout_seconds if self._timeout_seconds else None
+        # A /runsync reply already carries the job status; unfinished jobs continue as polled ones.
+        initial_status = job_info if use_sync else None
+        if use_webhook:
+            async with runpod_events.JobStatusListener(job_id) as listener:
+                return await self._await_job(job_id, request, listener, initial_status, deadline)
+        return await self._await_job(job_id, request, None, initial_status, deadline)
+
+    async def _post_job(self, path: str, content: bytes, request: LLMBatchRequest, **kwargs) -> httpx.Response:
+        """
+        POST a serverless job, retrying throttling with jittered exponential backoff.
+
+        Only responses where RunPod cannot have accepted the job are retried (see
+        _RETRYABLE_SUBMIT_STATUSES); failed connection attempts are already retried by the transport.
+        The serialised body is reused across attempts.
+        """
+
+        attempts = max(1, settings.runpod_submit_max_attempts)
+        for attempt in range(1, attempts + 1):
+            response = await self._client.post(path, content=content, headers=self._json_headers, **kwargs)
+            if response.status_code not in _RETRYABLE_SUBMIT_STATUSES or attempt == attempts:
+                break
+            delay = min(10.0, 0.5 * 2 ** (attempt - 1)) + random.uniform(0, 0.5)
+            self._log.warning(
+                "Transient error submitting RunPod job for {} (HTTP {}). Retrying in {:.1f}s",
+                request.document_id,
+                response.status_code,
+                delay,
+            )
+            await asyncio.sleep(delay)
+
+        self._ensure_success(response, request, action=f"POST {path}")
+        return response
+
+    def _is_sync_request(self, request: LLMBatchRequest) -> bool:
+        if self._use_runsync:
+            return True
+        return bool(request.tasks) and all(task.task.value in self._sync_tasks for task in request.tasks)
+
+    async def _await_job(
+        self,
+        job_id: str,
+        request: LLMBatchRequest,
+        listener: runpod_events.JobStatusListener | None,
+        status_payload: dict | None,
+        deadline: float | None,
+    ) -> List[LLMResponse]:
+        try:
+            async with asyncio.timeout_at(deadline):
+                return await self._poll_until_done(job_id, request, listener, status_payload)
+        except TimeoutError:
+            raise RuntimeError(self._timeout_message(request, job_id=job_id)) from None
+
+    def _timeout_message(self, request: LLMBatchRequest, *, job_id: str | None) -> str:
+        job = f"RunPod job {job_id}" if job_id else f"RunPod submission for job {request.document_id}"
+        task_names = [task.task for task in request.tasks]
+        return (
+            f"{job} exceeded timeout of {self._timeout_seconds}s "
+            f"(tasks={task_names}, pages={request.page_indices})"
+        )
+
+    async def _poll_until_done(
+        self,
+        job_id: str,
+        request: LLMBatchRequest,
+        listener: runpod_events.JobStatusListener | None,
+        status_payload: dict | None,
+    ) -> List[LLMResponse]:
+        """
+        Wait for a serverless job to finish; the overall deadline is enforced by _await_job.
+
+        Without a webhook the status endpoint is polled, quickly at first and progressively less
+        often for long jobs. With a webhook the pushed status wakes the wait immediately and polling
+        at the slowest rate only guards against lost callbacks.
+        """
+
+        transient_errors = 0
+        base_interval = self._poll_max_interval if listener is not None else self._poll_interval
+        poll_interval = base_interval
+        last_status = None
+
+        if status_payload is None and listener is not None:
+            status_payload = await listener.wait(poll_interval)
 
         while True:
-            if deadline and time.monotonic() >= deadline:
-                task_names = [task.task for task in request.tasks]
-                timeout_msg = (
-                    f"RunPod job {job_id} exceeded timeout of {self._timeout_seconds}s "
-                    f"(tasks={task_names}, pages={request.page_indices})"
-                )
-                raise RuntimeError(timeout_msg)
-
-            poll_attempts += 1
-            status_response = await self._client.get(f"/status/{job_id}", headers=headers)
-            try:
-                status_response.raise_for_status()
-            except httpx.HTTPStatusError as exc:
-                status_code = exc.response.status_code
-                if status_code in {429, 500, 502, 503, 504}:
-                    delay = min(5.0, 1.0 + poll_attempts * 0.5)
-                    logger.warning(
-                        "Transient error when polling RunPod status for job %s (HTTP %s). Retrying in %.1fs",
-                        job_id,
-                        status_code,
-                        delay,
-                    )
-                    sleep_for = delay
-                    if deadline:
-                        sleep_for = max(0.0, min(delay, deadline - time.monotonic()))
-                    await asyncio.sleep(sleep_for)
-                    continue
-                raise RuntimeError(self._format_http_error(exc, request, "GET /status")) from exc
-
-            status_payload = status_response.json()
+            if status_payload is None:
+                status_response = await self._status_poller.fetch(job_id)
+                try:
+                    status_response.raise_for_status()
+                except httpx.HTTPStatusError as exc:
+                    status_code = exc.response.status_code
+                    if status_code in _TRANSIENT_HTTP_STATUSES:
+                        transient_errors += 1
+                        delay = _jittered(min(5.0, 0.5 * 2**transient_errors))
+                        self._log.warning(
+                            "Transient error when polling RunPod status for job {} (HTTP {}). Retrying in {:.1f}s",
+                            job_id,
+                            status_code,
+                            delay,
+                        )
+                        await asyncio.sleep(delay)
+                        continue
+                    raise RuntimeError(self._format_http_error(exc, request, "GET /status")) from exc
+
+                transient_errors = 0
+                status_payload = orjson.loads(status_response.content)
+
             status = status_payload.get("status")
-            if status == "COMPLETED":
+            if status != last_status:
+                # A job that just left the queue is polled at the fast rate again.
+                poll_interval = base_interval
+                last_status = status
+            if status == _STATUS_COMPLETED:
                 output = status_payload.get("output")
                 if isinstance(output, list):
                     output = output[0] if output else {}
                 return self._build_responses(output, request)
-            if status in {"FAILED", "CANCELLED"}:
+            if status in _STATUS_FAILED:
                 error_msg = status_payload.get("error", "Unknown error")
                 raise RuntimeError(f"RunPod job {job_id} failed: {error_msg}")
-            sleep_for = self._poll_interval
-            if deadline:
-                sleep_for = max(0.0, min(self._poll_interval, deadline - time.monotonic()))
-            await asyncio.sleep(sleep_for)
+            status_payload = None
+            # Jitter keeps the jobs of one batch from polling in lockstep.
+            if listener is not None:
+                status_payload = await listener.wait(_jittered(poll_interval))
+            else:
+                await asyncio.sleep(_jittered(poll_interval))
+            poll_interval = min(self._poll_max_interval, poll_interval * self._poll_backoff_factor)
 
     @staticmethod
     def _normalize_task(raw_task: str | TaskType | None, request: LLMBatchRequest) -> TaskType:
         if isinstance(raw_task, TaskType):
             return raw_task
         if isinstance(raw_task, str):
-            try:
-                return TaskType(raw_task)
-            except ValueError:
-                logger.warning("Unknown task value '%s' returned by RunPod; defaulting to first task.", raw_task)
+            task = _TASK_BY_VALUE.get(raw_task)
+            if task is not None:
+                return task
+            logger.warning("Unknown task value '{}' returned by RunPod; defaulting to first task.", raw_task)
         return request.tasks[0].task if request.tasks else TaskType.LAYOUT
 
     def _build_responses(self, payload: dict | list, request: LLMBatchRequest) -> List[LLMResponse]:
@@ -167,24 +470,32 @@ class RunPodClient:
             else:
                 entries = [payload]
 
-        responses: List[LLMResponse] = []
-        for entry in entries:
-            if not isinstance(entry, dict):
-                logger.warning("Skipping malformed response entry: %s", entry)
-                continue
-            task = self._normalize_task(entry.get("task"), request)
-            responses.append(
-                LLMResponse(
-                    request_id=entry.get("request_id", ""),
-                    document_id=request.document_id,
-                    model_version=entry.get("model_version", settings.model_version),
-                    task=task,
-                    raw_text=entry.get("raw_text", ""),
-                    parsed_json=entry.get("parsed_json"),
-                    tokens_input=entry.get("tokens_input"),
-                    tokens_output=entry.get("tokens_output"),
-                    latency_ms=entry.get("latency_ms"),
-                )
+        document_id = request.document_id
+        default_model = settings.model_version
+        normalize_task = self._normalize_task
+        # Entries come from our own worker and the task is already normalised to a TaskType, so the
+        # models are constructed without a second validation pass.
+        construct = LLMResponse.model_construct
+        responses = [
+            construct(
+                request_id=entry.get("request_id", ""),
+                document_id=document_id,
+                model_version=entry.get("model_version", default_model),
+                task=normalize_task(entry.get("task"), request),
+                raw_text=entry.get("raw_text", ""),
+                parsed_json=entry.get("parsed_json"),
+                tokens_input=entry.get("tokens_input"),
+                tokens_output=entry.get("tokens_output"),
+                latency_ms=entry.get("latency_ms"),
+            )
+            for entry in entries
+            if isinstance(entry, dict)
+        ]
+        if len(responses) != len(entries):
+            self._log.warning(
+                "Skipped {} malformed response entries for job {}",
+                len(entries) - len(responses),
+                document_id,
             )
         return responses
 
@@ -201,9 +512,11 @@ class RunPodClient:
         action: str,
     ) -> str:
         status_code = exc.response.status_code
-        body_text = exc.response.text.strip()
-        if len(body_text) > 1000:
-            body_preview = f"{body_text[:1000]}…"
+        # Only the previewed prefix is decoded, however large the error body is.
+        body = exc.response.content
+        body_text = body[:_ERROR_PREVIEW_BYTES].decode("utf-8", errors="replace").strip()
+        if len(body) > _ERROR_PREVIEW_BYTES:
+            body_preview = f"{body_text}…"
         else:
             body_preview = body_text or "<empty body>"
 
@@ -229,5 +542,90 @@ class RunPodClient:
         if hint:
             message = f"{message}. Hint: {hint}"
 
-        logger.error(message)
+        self._log.error(message)
         return message
+
+
+@lru_cache(maxsize=1)
+def _ssl_context() -> ssl.SSLContext:
+    # The CA bundle is parsed once per process instead of for every pool that gets created.
+    return ssl.create_default_context(cafile=certifi.where())
+
+
+def _jittered(delay: float) -> float:
+    return delay * random.uniform(0.8, 1.2)
+
+
+class _InflightRequest:
+    """A RunPod request shared by every caller that submitted identical content."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task[List[LLMResponse]]) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class _StatusPoller:
+    """
+    Coalesces /status requests for the jobs of one client into shared sweeps.
+
+    Jobs that become due within the same tick are fetched together (multiplexed over the shared
+    connection), and concurrent waiters on the same job share a single GET. RunPod has no bulk
+    status endpoint, so each distinct job still costs one request per sweep.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, headers: dict[str, str], *, tick: float) -> None:
+        self._client = client
+        self._headers = headers
+        self._tick = tick
+        self._waiters: dict[str, list[asyncio.Future[httpx.Response]]] = {}
+        self._task: asyncio.Task | None = None
+
+    async def fetch(self, job_id: str) -> httpx.Response:
+        """Return the job's /status response from the next sweep."""
+
+        future: asyncio.Future[httpx.Response] = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(job_id, []).append(future)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return await future
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        # Pending fetch() callers fail now instead of hanging until their job deadline (or forever).
+        waiters, self._waiters = self._waiters, {}
+        _fail_waiters(waiters)
+
+    async def _run(self) -> None:
+        waiters: dict[str, list[asyncio.Future[httpx.Response]]] = {}
+        try:
+            while self._waiters:
+                waiters, self._waiters = self._waiters, {}
+                outcomes = await asyncio.gather(
+                    *(self._client.get(f"/status/{job_id}", headers=self._headers) for job_id in waiters),
+                    return_exceptions=True,
+                )
+                for futures, outcome in zip(waiters.values(), outcomes):
+                    for future in futures:
+                        if future.done():
+                            continue
+                        if isinstance(outcome, BaseException):
+                            future.set_exception(outcome)
+                        else:
+                            future.set_result(outcome)
+                # Give jobs whose poll interval ends shortly after this sweep a chance to join the next one.
+                await asyncio.sleep(self._tick)
+        except asyncio.CancelledError:
+            # The sweep taken out of self._waiters is only reachable from here.
+            _fail_waiters(waiters)
+            raise
+
+
+def _fail_waiters(waiters: dict[str, list[asyncio.Future[httpx.Response]]]) -> None:
+    for futures in waiters.values():
+        for future in futures:
+            if not future.done():
+                future.set_exception(RuntimeError("RunPod status poller was closed"))
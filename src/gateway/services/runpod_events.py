@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import hmac
+import time
+from typing import Any
+from urllib.parse import urlencode
+
+import orjson
+from loguru import logger
+from redis import asyncio as aioredis
+
+from shared import get_settings
+
+settings = get_settings()
+
+# Pushed statuses are kept long enough for a worker that subscribes late to still find them.
+STATUS_TTL_SECONDS = 3600
+
+# One client (and connection pool) per process, shared by the webhook publisher and every listener.
+_redis: aioredis.Redis | None = None
+
+
+def webhook_enabled() -> bool:
+    return bool(settings.runpod_webhook_url and settings.runpod_webhook_secret)
+
+
+def webhook_url() -> str:
+    """Callback URL handed to RunPod with each serverless job."""
+
+    base_url = settings.runpod_webhook_url or ""
+    separator = "&" if "?" in base_url else "?"
+    return f"{base_url}{separator}{urlencode({'token': settings.runpod_webhook_secret})}"
+
+
+def verify_token(token: str) -> bool:
+    # Compared as bytes: compare_digest rejects non-ASCII str with TypeError instead of returning False.
+    secret = (settings.runpod_webhook_secret or "").encode("utf-8")
+    return webhook_enabled() and hmac.compare_digest(token.encode("utf-8"), secret)
+
+
+async def publish_job_status(payload: dict[str, Any], message: bytes | None = None) -> None:
+    """
+    Record a job status pushed by RunPod and wake the worker waiting on that job.
+
+    `message` is the payload's JSON encoding when the caller already has it (e.g. the webhook body).
+    """
+
+    job_id = payload.get("id")
+    if not job_id:
+        raise ValueError("RunPod webhook payload missing job id")
+
+    key = _status_key(job_id)
+    if message is None:
+        message = orjson.dumps(payload)
+    async with _get_redis().pipeline(transaction=False) as pipe:
+        pipe.set(key, message, ex=STATUS_TTL_SECONDS)
+        pipe.publish(key, message)
+        await pipe.execute()
+    logger.debug("Published RunPod status {} for job {}", payload.get("status"), job_id)
+
+
+async def close() -> None:
+    global _redis
+
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+def _get_redis() -> aioredis.Redis:
+    global _redis
+
+    if _redis is None:
+        _redis = aioredis.from_url(settings.redis_url)
+    return _redis
+
+
+class JobStatusListener:
+    """Receives webhook-delivered statuses for a single RunPod job."""
+
+    def __init__(self, job_id: str) -> None:
+        self._key = _status_key(job_id)
+        self._pubsub = None
+        self._pending: bytes | None = None
+
+    async def __aenter__(self) -> "JobStatusListener":
+        redis = _get_redis()
+        # The subscription holds a pooled connection only while the job is awaited; closing the
+        # pubsub hands it back for the next job instead of reconnecting.
+        self._pubsub = redis.pubsub()
+        await self._pubsub.subscribe(self._key)
+        # A webhook that fired before the subscription was in place is still recorded under the key.
+        self._pending = await redis.get(self._key)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:  # type: ignore[override]
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+
+    async def wait(self, timeout: float) -> dict[str, Any] | None:
+        """Return the next pushed status, or None if nothing arrives within `timeout` seconds."""
+
+        if self._pending is not None:
+            raw, self._pending = self._pending, None
+            return orjson.loads(raw)
+
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None:
+                return orjson.loads(message["data"])
+        return None
+
+
+def _status_key(job_id: str) -> str:
+    return f"runpod:status:{job_id}"
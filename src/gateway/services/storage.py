@@ -1,7 +1,18 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import hmac
+import os
+import shutil
+import threading
+import time
+from functools import lru_cache
 from pathlib import Path
+from typing import AsyncIterator, BinaryIO
+from urllib.parse import quote, urlencode
 
+import aiofiles
 from fastapi import UploadFile
 from loguru import logger
 
@@ -10,8 +21,19 @@ from shared import get_settings
 settings = get_settings()
 
 
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES."""
+
+
+@lru_cache(maxsize=1)
+def _storage_root() -> Path:
+    return Path(settings.local_storage_root).resolve()
+
+
+@lru_cache(maxsize=4096)
 def _job_root(job_id: str) -> Path:
-    root = Path(settings.local_storage_root).resolve() / job_id
+    # Created once per process; purge_job_cache clears this cache when it removes directories.
+    root = _storage_root() / job_id
     root.mkdir(parents=True, exist_ok=True)
     return root
 
@@ -19,18 +41,57 @@ def _job_root(job_id: str) -> Path:
 async def persist_upload(upload: UploadFile, job_id: str) -> str:
     """
     Save the uploaded PDF to local storage for downstream processing.
+
+    The upload is copied in fixed-size chunks so memory stays flat regardless of file size, and the
+    whole copy runs in one worker thread rather than hopping threads for every chunk read and write.
+    """
+
+    destination = _job_root(job_id) / Path(upload.filename).name
+    check_upload_size(upload.size)
+
+    logger.debug("Persisting upload for job {} to {}", job_id, destination)
+    await asyncio.to_thread(_copy_upload, upload.file, destination)
+    return str(destination)
+
+
+def _copy_upload(source: BinaryIO, destination: Path) -> None:
+    source.seek(0)
+    with destination.open("wb") as output:
+        shutil.copyfileobj(source, output, max(1, settings.upload_chunk_size_bytes))
+    source.seek(0)
+
+
+async def persist_stream(chunks: AsyncIterator[bytes], filename: str, job_id: str) -> str:
+    """
+    Write a raw request body straight to local storage as it arrives.
+
+    Unlike multipart uploads this never touches Starlette's spooled temporary file. The size limit
+    is enforced as the body arrives, and a partial file is removed if the stream fails.
     """
 
-    destination_dir = _job_root(job_id)
-    destination = destination_dir / upload.filename
+    destination = _job_root(job_id) / Path(filename).name
 
-    logger.debug("Persisting upload for job %s to %s", job_id, destination)
-    contents = await upload.read()
-    destination.write_bytes(contents)
-    await upload.seek(0)
+    logger.debug("Streaming upload for job {} to {}", job_id, destination)
+    received = 0
+    try:
+        async with aiofiles.open(destination, "wb") as output:
+            async for chunk in chunks:
+                if chunk:
+                    received += len(chunk)
+                    check_upload_size(received)
+                    await output.write(chunk)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
     return str(destination)
 
 
+def check_upload_size(size: int | None) -> None:
+    limit = settings.max_upload_bytes
+    if limit > 0 and size is not None and size > limit:
+        raise UploadTooLargeError(f"Upload exceeds the {limit} byte limit")
+
+
 def get_local_workspace(job_id: str) -> Path:
     """
     Return the local scratch directory used to store derived artefacts such as page images.
@@ -57,37 +118,160 @@ def write_bytes(path: Path, data: bytes) -> None:
     path.write_bytes(data)
 
 
+def read_cached_page(digest: str) -> bytes | None:
+    """
+    Return the JPEG previously encoded for a page with this pixel digest, if the page cache is enabled.
+    """
+
+    if not settings.page_cache_enabled:
+        return None
+    path = _page_cache_dir() / f"{digest}.jpg"
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    # Hits refresh the entry's mtime, so eviction drops the least recently used pages first.
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return data
+
+
+def write_cached_page(digest: str, data: bytes) -> None:
+    global _page_cache_bytes
+
+    if not settings.page_cache_enabled:
+        return
+    path = _page_cache_dir() / f"{digest}.jpg"
+    if path.exists():
+        return
+    # Write-then-rename so concurrent workers never observe a partially written entry.
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    write_bytes(temp_path, data)
+    os.replace(temp_path, path)
+
+    with _page_cache_lock:
+        if _page_cache_bytes is None:
+            _page_cache_bytes = _page_cache_size()
+        else:
+            _page_cache_bytes += len(data)
+        if 0 < settings.page_cache_max_bytes < _page_cache_bytes:
+            _page_cache_bytes = _evict_cached_pages(settings.page_cache_max_bytes * 9 // 10)
+
+
+# Running size estimate of the page cache as seen by this process; other workers write to the same
+# directory, so eviction always rescans before deleting anything.
+_page_cache_bytes: int | None = None
+_page_cache_lock = threading.Lock()
+
+
+def _page_cache_dir() -> Path:
+    return _storage_root() / "_cache" / "pages"
+
+
+def _page_cache_entries() -> list[tuple[float, int, str]]:
+    entries = []
+    with os.scandir(_page_cache_dir()) as scan:
+        for entry in scan:
+            if not entry.name.endswith(".jpg"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return entries
+
+
+def _page_cache_size() -> int:
+    return sum(size for _, size, _ in _page_cache_entries())
+
+
+def _evict_cached_pages(target_bytes: int) -> int:
+    """Delete the least recently used cached pages until the cache fits `target_bytes`; returns the new size."""
+
+    entries = sorted(_page_cache_entries())
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    for _, size, path in entries:
+        if total <= target_bytes:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        evicted += 1
+    logger.info("Evicted {} cached page images; page cache now holds {} bytes", evicted, total)
+    return total
+
+
+def presign_enabled() -> bool:
+    return bool(settings.attachment_base_url and settings.attachment_signing_key)
+
+
+def presign(path: Path, ttl: int | None = None) -> str:
+    """
+    Return an expiring, HMAC-signed gateway URL from which the inference worker can fetch the file.
+    """
+
+    if not presign_enabled():
+        raise RuntimeError("Signed file URLs require ATTACHMENT_BASE_URL and ATTACHMENT_SIGNING_KEY")
+
+    relative_path = path.resolve().relative_to(_storage_root()).as_posix()
+    expires = int(time.time()) + (settings.attachment_url_ttl_seconds if ttl is None else ttl)
+    query = urlencode({"expires": expires, "signature": _sign(relative_path, expires)})
+    base_url = settings.attachment_base_url.rstrip("/")
+    return f"{base_url}{settings.api_prefix}/files/{quote(relative_path)}?{query}"
+
+
+def resolve_presigned(relative_path: str, expires: int, signature: str) -> Path | None:
+    """
+    Map a signed URL back to a file under the storage root, or None if the link is invalid or expired.
+    """
+
+    if not presign_enabled() or expires < time.time():
+        return None
+    if not hmac.compare_digest(_sign(relative_path, expires), signature):
+        return None
+
+    root = _storage_root()
+    path = (root / relative_path).resolve()
+    if not path.is_relative_to(root) or not path.is_file():
+        return None
+    return path
+
+
+def _sign(relative_path: str, expires: int) -> str:
+    message = f"{relative_path}:{expires}".encode("utf-8")
+    return hmac.new(settings.attachment_signing_key.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
 def purge_job_cache(job_id: str, remove_original: bool = False) -> None:
     """
     Remove derived artefacts for the job. Optionally delete the original upload.
     """
 
-    root = _job_root(job_id)
-    if not root.exists():
+    # Not _job_root(): purging a job that has no files must not create its directory first.
+    root = _storage_root() / job_id
+    if not root.is_dir():
         return
+    _job_root.cache_clear()
 
     workspace = root / "workspace"
     if workspace.exists():
-        logger.info("Purging workspace cache for job %s under %s", job_id, workspace)
-        for child in sorted(workspace.rglob("*"), reverse=True):
-            if child.is_file():
-                child.unlink(missing_ok=True)
-            elif child.is_dir():
-                child.rmdir()
-        workspace.rmdir()
+        logger.info("Purging workspace cache for job {} under {}", job_id, workspace)
+        shutil.rmtree(workspace, ignore_errors=True)
 
     if remove_original:
-        logger.info("Removing original upload for job %s", job_id)
-        for item in root.iterdir():
-            if item.is_file():
-                item.unlink(missing_ok=True)
-            elif item.is_dir() and item.name != "workspace":
-                for sub in sorted(item.rglob("*"), reverse=True):
-                    if sub.is_file():
-                        sub.unlink(missing_ok=True)
-                    elif sub.is_dir():
-                        sub.rmdir()
-                item.rmdir()
+        logger.info("Removing original upload for job {}", job_id)
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.unlink(entry.path)
 
     # Clean up root directory if empty
     try:
@@ -1,53 +1,158 @@
-import asyncio
 from datetime import datetime
 from typing import Dict, List, Sequence
 from uuid import uuid4
 
 from loguru import logger
+from redis import asyncio as aioredis
 
+from shared import get_settings
 from shared.schemas import DocumentJob, DocumentStatus, TaskType
 
+settings = get_settings()
+
 
 class DocumentStore:
-    """Minimal in-memory repository. Replace with a persistent database in production."""
+    """
+    Minimal in-memory repository. Replace with a persistent database in production.
+
+    Every method runs on the event loop thread and none of them awaits, so each call completes
+    without interleaving and the dict needs no lock. The methods stay async so a database-backed
+    store can replace this one without touching the routes.
+
+    The JSON rendering of each job is cached for the read endpoints and dropped whenever the job is
+    written, so callers that mutate a job must upsert it afterwards.
+    """
 
     def __init__(self) -> None:
         self._documents: Dict[str, DocumentJob] = {}
-        self._lock = asyncio.Lock()
+        self._serialized: Dict[str, bytes] = {}
+
+    async def create_job(self, filename: str, tasks: Sequence[TaskType]) -> DocumentJob:
+        job_id = uuid4().hex
+        job = DocumentJob(id=job_id, filename=filename, tasks=list(tasks))
+        self._documents[job_id] = job
+        logger.debug("Created job {}", job_id)
+        return job
+
+    async def list_jobs(self) -> List[DocumentJob]:
+        return list(self._documents.values())
+
+    async def get_job(self, job_id: str) -> DocumentJob | None:
+        return self._documents.get(job_id)
+
+    async def get_job_json(self, job_id: str) -> bytes | None:
+        job = self._documents.get(job_id)
+        if job is None:
+            return None
+        return self._job_json(job)
+
+    async def list_jobs_json(self) -> bytes:
+        return b"[" + b",".join(self._job_json(job) for job in self._documents.values()) + b"]"
+
+    async def update_status(self, job_id: str, status: DocumentStatus) -> DocumentJob | None:
+        job = self._documents.get(job_id)
+        if job is None:
+            return None
+        job.status = status
+        job.updated_at = datetime.utcnow()
+        self._serialized.pop(job_id, None)
+        logger.debug("Updated job {} to {}", job_id, status)
+        return job
+
+    async def upsert(self, job: DocumentJob) -> DocumentJob:
+        job.updated_at = datetime.utcnow()
+        self._documents[job.id] = job
+        self._serialized.pop(job.id, None)
+        logger.debug("Upserted job {}", job.id)
+        return job
+
+    def _job_json(self, job: DocumentJob) -> bytes:
+        serialized = self._serialized.get(job.id)
+        if serialized is None:
+            serialized = job.__pydantic_serializer__.to_json(job)
+            self._serialized[job.id] = serialized
+        return serialized
+
+    async def close(self) -> None:
+        return None
+
+
+class RedisDocumentStore:
+    """
+    Redis-backed repository shared by every gateway process.
+
+    Each job is stored as its JSON rendering under `bim:job:<id>`, so the read endpoints hand the
+    stored bytes straight to the response. Writes replace the whole document; concurrent status
+    updates to the same job from different processes are last-writer-wins. Every write restarts the
+    job's DOCUMENT_STORE_TTL_SECONDS expiry, so finished jobs age out instead of accumulating.
+    """
+
+    KEY_PREFIX = "bim:job:"
+
+    def __init__(self, redis_url: str, ttl_seconds: int | None = None) -> None:
+        self._redis = aioredis.from_url(redis_url)
+        self._ttl_seconds = ttl_seconds or None
 
     async def create_job(self, filename: str, tasks: Sequence[TaskType]) -> DocumentJob:
-        async with self._lock:
-            job_id = uuid4().hex
-            job = DocumentJob(id=job_id, filename=filename, tasks=list(tasks))
-            self._documents[job_id] = job
-            logger.debug("Created job {}", job_id)
-            return job
+        job = DocumentJob(id=uuid4().hex, filename=filename, tasks=list(tasks))
+        await self._save(job)
+        logger.debug("Created job {}", job.id)
+        return job
 
     async def list_jobs(self) -> List[DocumentJob]:
-        async with self._lock:
-            return list(self._documents.values())
+        return [DocumentJob.model_validate_json(raw) for raw in await self._load_all()]
 
     async def get_job(self, job_id: str) -> DocumentJob | None:
-        async with self._lock:
-            return self._documents.get(job_id)
+        raw = await self._redis.get(self._key(job_id))
+        if raw is None:
+            return None
+        return DocumentJob.model_validate_json(raw)
+
+    async def get_job_json(self, job_id: str) -> bytes | None:
+        return await self._redis.get(self._key(job_id))
+
+    async def list_jobs_json(self) -> bytes:
+        return b"[" + b",".join(await self._load_all()) + b"]"
 
     async def update_status(self, job_id: str, status: DocumentStatus) -> DocumentJob | None:
-        async with self._lock:
-            job = self._documents.get(job_id)
-            if job is None:
-                return None
-            job.status = status
-            job.updated_at = datetime.utcnow()
-            self._documents[job_id] = job
-            logger.debug("Updated job {} to {}", job_id, status)
-            return job
+        job = await self.get_job(job_id)
+        if job is None:
+            return None
+        job.status = status
+        job.updated_at = datetime.utcnow()
+        await self._save(job)
+        logger.debug("Updated job {} to {}", job_id, status)
+        return job
 
     async def upsert(self, job: DocumentJob) -> DocumentJob:
-        async with self._lock:
-            job.updated_at = datetime.utcnow()
-            self._documents[job.id] = job
-            logger.debug("Upserted job {}", job.id)
-            return job
+        job.updated_at = datetime.utcnow()
+        await self._save(job)
+        logger.debug("Upserted job {}", job.id)
+        return job
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+    async def _save(self, job: DocumentJob) -> None:
+        await self._redis.set(self._key(job.id), job.__pydantic_serializer__.to_json(job), ex=self._ttl_seconds)
+
+    async def _load_all(self) -> List[bytes]:
+        keys = [key async for key in self._redis.scan_iter(match=f"{self.KEY_PREFIX}*", count=500)]
+        if not keys:
+            return []
+        # A job deleted between the scan and the fetch comes back as None.
+        return [raw for raw in await self._redis.mget(keys) if raw is not None]
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.KEY_PREFIX}{job_id}"
+
+
+def _create_store() -> DocumentStore | RedisDocumentStore:
+    if settings.document_store_backend == "redis":
+        return RedisDocumentStore(settings.redis_url, settings.document_store_ttl_seconds)
+    if settings.document_store_backend != "memory":
+        raise ValueError(f"Unknown DOCUMENT_STORE_BACKEND '{settings.document_store_backend}'")
+    return DocumentStore()
 
 
-document_store = DocumentStore()
+document_store = _create_store()
@@ -3,13 +3,20 @@ from __future__ import annotations
 import asyncio
 from typing import List
 
-from celery import Celery
+from celery import Celery, chain
+from celery.signals import worker_init, worker_process_shutdown
 from loguru import logger
+from pydantic import TypeAdapter
 
 from shared import get_settings
-from shared.schemas import DocumentJob
+from shared.schemas import Attachment, DocumentJob, LLMResponse
 
-from .services import pdf_pipeline, runpod_client
+from .services import pdf_pipeline, result_cache, runpod_client, runpod_events
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - uvloop is unavailable on Windows
+    uvloop = None
 
 settings = get_settings()
 
@@ -23,35 +30,135 @@ celery_app.conf.update(
     worker_max_tasks_per_child=50,
 )
 
+# RunPod polling and batch fan-out run on uvloop when it is installed (it ships with uvicorn[standard]).
+_loop_factory = uvloop.new_event_loop if uvloop is not None else None
+
+# One event loop and RunPod client per worker process, created lazily after the prefork so every
+# task reuses the warm connection pool instead of reconnecting (and re-handshaking TLS) each time.
+_runner: asyncio.Runner | None = None
+_client: runpod_client.RunPodClient | None = None
+
+# Serialises a whole batch of responses in one pydantic-core call at the task boundary.
+_RESPONSES_ADAPTER = TypeAdapter(List[LLMResponse])
+
+
+@worker_init.connect
+def _check_rasterizer(**_: object) -> None:
+    pdf_pipeline.ensure_rasterizer_available()
+
+
+def _get_runner() -> asyncio.Runner:
+    global _runner
+
+    if _runner is None:
+        _runner = asyncio.Runner(loop_factory=_loop_factory)
+    return _runner
+
+
+def _get_client() -> runpod_client.RunPodClient:
+    global _client
+
+    if _client is None:
+        _client = runpod_client.RunPodClient()
+    return _client
+
+
+@worker_process_shutdown.connect
+def _close_runpod_client(**_: object) -> None:
+    global _client, _runner
+
+    if _runner is None:
+        return
+
+    async def _close() -> None:
+        if _client is not None:
+            await _client.close()
+        await runpod_client.RunPodClient.shutdown()
+        await result_cache.close()
+        await runpod_events.close()
+
+    try:
+        _runner.run(_close())
+    finally:
+        _runner.close()
+        _runner = None
+        _client = None
+
+
+def warm_broker_connection() -> None:
+    """
+    Open a pooled broker connection ahead of the first upload so enqueueing never pays the
+    connection setup; the producer goes back to the pool for send_task to reuse.
+    """
+
+    with celery_app.producer_pool.acquire(block=True) as producer:
+        producer.connection.ensure_connection(max_retries=1)
+
 
 def enqueue_document_processing(job: DocumentJob, pdf_path: str) -> None:
-    logger.info("Queueing document %s for processing", job.id)
+    logger.info("Queueing document {} for processing", job.id)
+    job_payload = job.model_dump(mode="json")
+    if settings.celery_split_stages:
+        # CPU-bound rendering and I/O-bound RunPod waits go to separately sized worker pools; only
+        # the page filenames travel between the two stages.
+        chain(
+            celery_app.signature(
+                "gateway.rasterize_document",
+                args=[job_payload, pdf_path],
+                queue=settings.celery_rasterize_queue,
+            ),
+            celery_app.signature(
+                "gateway.submit_document",
+                args=[job_payload],
+                queue=settings.celery_submit_queue,
+            ),
+        ).apply_async()
+        return
+
     celery_app.send_task(
         "gateway.process_document",
-        args=[job.model_dump(mode="json"), pdf_path],
+        args=[job_payload, pdf_path],
     )
 
 
 @celery_app.task(name="gateway.process_document", bind=True)
 def process_document(self, job_payload: dict, pdf_path: str) -> List[dict]:
     job = DocumentJob.model_validate(job_payload)
-    logger.info("Worker started processing job %s", job.id)
+    logger.info("Worker started processing job {}", job.id)
 
     attachments = pdf_pipeline.rasterize_pdf(pdf_path, job.id)
+    return _submit_attachments(job, attachments)
+
+
+@celery_app.task(name="gateway.rasterize_document")
+def rasterize_document(job_payload: dict, pdf_path: str) -> List[str]:
+    job = DocumentJob.model_validate(job_payload)
+    return pdf_pipeline.rasterize_pdf_to_pages(pdf_path, job.id)
+
+
+@celery_app.task(name="gateway.submit_document")
+def submit_document(page_filenames: List[str], job_payload: dict) -> List[dict]:
+    job = DocumentJob.model_validate(job_payload)
+    logger.info("Worker submitting {} rendered pages for job {}", len(page_filenames), job.id)
+
+    attachments = pdf_pipeline.load_page_attachments(job.id, page_filenames)
+    return _submit_attachments(job, attachments)
+
+
+def _submit_attachments(job: DocumentJob, attachments: List[Attachment]) -> List[dict]:
     llm_requests = pdf_pipeline.build_llm_requests(job, attachments)
 
     async def _submit_all() -> List[dict]:
         if not llm_requests:
-            logger.warning("No LLM requests created for job %s", job.id)
+            logger.warning("No LLM requests created for job {}", job.id)
             return []
 
-        async with runpod_client.RunPodClient() as client:
-            responses = await client.submit_batch(llm_requests)
-        logger.info("Received %s responses from RunPod for job %s", len(responses), job.id)
-        return [response.model_dump(mode="json") for response in responses]
+        responses = await _get_client().submit_batch(llm_requests)
+        logger.info("Received {} responses from RunPod for job {}", len(responses), job.id)
+        return _RESPONSES_ADAPTER.dump_python(responses, mode="json")
 
     try:
-        return asyncio.run(_submit_all())
+        return _get_runner().run(_submit_all())
     except Exception as exc:  # pragma: no cover - defensive logging
-        logger.exception("Processing failed for job %s: %s", job.id, exc)
+        logger.exception("Processing failed for job {}: {}", job.id, exc)
         raise
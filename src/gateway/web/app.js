@@ -8,6 +8,7 @@ const jobsBody = document.getElementById("jobsBody");
 const jobCount = document.getElementById("jobCount");
 
 const DEFAULT_TASKS = ["layout", "rooms", "annotations"];
+const STREAM_UPLOAD_THRESHOLD_BYTES = 10 * 1024 * 1024;
 
 function addMessage(role, text) {
     const bubble = document.createElement("div");
@@ -121,14 +122,23 @@ async function handleUpload(file) {
     const params = new URLSearchParams();
     DEFAULT_TASKS.forEach((task) => params.append("tasks", task));
 
-    const body = new FormData();
-    body.append("file", file, file.name);
-
     try {
-        const response = await fetch(`/api/v1/documents?${params.toString()}`, {
-            method: "POST",
-            body,
-        });
+        let response;
+        if (file.size > STREAM_UPLOAD_THRESHOLD_BYTES) {
+            // Large drawings go through the raw streaming endpoint to skip multipart spooling.
+            response = await fetch(`/api/v1/documents:stream?${params.toString()}`, {
+                method: "POST",
+                headers: { "X-Filename": encodeURIComponent(file.name) },
+                body: file,
+            });
+        } else {
+            const body = new FormData();
+            body.append("file", file, file.name);
+            response = await fetch(`/api/v1/documents?${params.toString()}`, {
+                method: "POST",
+                body,
+            });
+        }
 
         if (!response.ok) {
             const errorText = await response.text();
@@ -1,10 +1,18 @@
 from __future__ import annotations
 
+import base64
 from datetime import datetime
 from enum import Enum
 from typing import Any, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_serializer
+
+try:
+    from pybase64 import b64encode_as_string
+except ImportError:  # pragma: no cover - SIMD accelerator is optional
+
+    def b64encode_as_string(data: bytes) -> str:
+        return base64.b64encode(data).decode("ascii")
 
 
 class DocumentStatus(str, Enum):
@@ -95,9 +103,57 @@ class BIMPayload(BaseModel):
 
 
 class Attachment(BaseModel):
+    # Immutable so one instance (and its base64 payload) can be shared by every request and task
+    # that references the page; derive variants with model_copy().
+    model_config = ConfigDict(frozen=True)
+
     filename: str
     content_type: str
-    data_base64: str
+    data_base64: str | None = None
+    data_url: str | None = Field(
+        default=None,
+        description="Signed URL to fetch the attachment from instead of inline base64 data.",
+    )
+    content_ref: str | None = Field(
+        default=None,
+        description="Filename of an earlier attachment in the same request with identical content.",
+    )
+
+    # Raw bytes held outside the fields. Inline attachments are base64-encoded into `data_base64`
+    # only when serialised; the others travel as binary multipart parts.
+    _content: bytes | None = PrivateAttr(default=None)
+    _inline: bool = PrivateAttr(default=False)
+
+    @classmethod
+    def from_bytes(cls, filename: str, content_type: str, content: bytes, *, inline: bool = False) -> "Attachment":
+        attachment = cls(filename=filename, content_type=content_type)
+        attachment._content = content
+        attachment._inline = inline
+        return attachment
+
+    @property
+    def content(self) -> bytes | None:
+        return self._content
+
+    @property
+    def is_binary(self) -> bool:
+        """Whether the content must be sent as a multipart part rather than inside the JSON body."""
+        return self._content is not None and not self._inline
+
+    @property
+    def inline_size(self) -> int:
+        """Size of the base64 payload this attachment adds to a JSON body."""
+        if self.data_base64 is not None:
+            return len(self.data_base64)
+        if self._inline and self._content is not None:
+            return (len(self._content) + 2) // 3 * 4
+        return 0
+
+    @field_serializer("data_base64")
+    def _serialize_data_base64(self, data_base64: str | None) -> str | None:
+        if data_base64 is None and self._inline and self._content is not None:
+            return b64encode_as_string(self._content)
+        return data_base64
 
 
 class LLMTaskPrompt(BaseModel):
@@ -118,6 +174,8 @@ class LLMRequest(BaseModel):
 
 
 class LLMResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     request_id: str
     document_id: str
     model_version: str
@@ -140,6 +198,31 @@ class LLMBatchRequest(BaseModel):
     )
     context: dict[str, Any] = Field(default_factory=dict)
 
+    def resolve_content_refs(self) -> "LLMBatchRequest":
+        """
+        Return the request with every `content_ref` attachment carrying the data of the attachment it names.
+
+        The gateway sends repeated pages as references to their first copy; the model needs each page's
+        own image. Returns `self` when nothing is referenced.
+        """
+
+        if not any(attachment.content_ref for attachment in self.attachments):
+            return self
+
+        by_filename = {attachment.filename: attachment for attachment in self.attachments}
+        resolved: List[Attachment] = []
+        for attachment in self.attachments:
+            if attachment.content_ref:
+                source = by_filename.get(attachment.content_ref)
+                if source is None or source.content_ref:
+                    raise ValueError(
+                        f"Attachment {attachment.filename} references unknown attachment {attachment.content_ref}"
+                    )
+                # The copy shares the source's payload, including raw bytes from a multipart upload.
+                attachment = source.model_copy(update={"filename": attachment.filename})
+            resolved.append(attachment)
+        return self.model_copy(update={"attachments": resolved})
+
 
 class DocumentJob(BaseModel):
     id: str
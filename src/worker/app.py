@@ -1,13 +1,19 @@
-from fastapi import FastAPI, HTTPException
+from typing import List
+
+from fastapi import FastAPI, File, Form, HTTPException, Response, UploadFile
+from fastapi.exceptions import RequestValidationError
 from loguru import logger
+from pydantic import TypeAdapter, ValidationError
 
 from shared import get_settings
-from shared.schemas import LLMBatchRequest, LLMResponse
+from shared.schemas import Attachment, LLMBatchRequest, LLMResponse
 
 from . import inference
 
 settings = get_settings()
 
+_RESPONSES_ADAPTER = TypeAdapter(list[LLMResponse])
+
 app = FastAPI(
     title="BIM OCR RunPod Worker",
     version="0.1.0",
@@ -15,22 +21,53 @@ app = FastAPI(
 )
 
 
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    await inference.close_batcher()
+
+
 @app.get("/healthz")
 async def health_check() -> dict[str, str]:
     return {"status": "ok", "model": settings.model_version}
 
 
+# The analyze routes serialise their results in one pass and return the bytes directly, skipping
+# FastAPI's response-model validation; response_model only documents the schema.
 @app.post("/analyze", response_model=list[LLMResponse])
-async def analyze(request: LLMBatchRequest) -> list[LLMResponse]:
+async def analyze(request: LLMBatchRequest) -> Response:
     try:
         result = await inference.run_analysis(request)
-        logger.info(
-            "Processed RunPod batch for document %s page_indices=%s tasks=%s",
-            request.document_id,
-            request.page_indices,
-            [task.task for task in request.tasks],
+        logger.opt(lazy=True).info(
+            "Processed RunPod batch for document {} page_indices={} tasks={}",
+            lambda: request.document_id,
+            lambda: request.page_indices,
+            lambda: [task.task for task in request.tasks],
         )
-        return result
+        return Response(content=_RESPONSES_ADAPTER.dump_json(result), media_type="application/json")
     except Exception as exc:  # pragma: no cover - defensive logging
-        logger.exception("Inference failed: %s", exc)
+        logger.exception("Inference failed: {}", exc)
         raise HTTPException(status_code=500, detail="Inference failed") from exc
+
+
+@app.post("/analyze/multipart", response_model=list[LLMResponse])
+async def analyze_multipart(
+    meta: str = Form(...),
+    attachments: List[UploadFile] = File(default_factory=list),
+) -> Response:
+    """Same as /analyze, with page images sent as binary parts matched to attachments by filename."""
+    try:
+        request = LLMBatchRequest.model_validate_json(meta)
+    except ValidationError as exc:
+        # Reported like any other invalid form field (422) rather than as an inference failure.
+        raise RequestValidationError(
+            [{**error, "loc": ("body", "meta", *error["loc"])} for error in exc.errors(include_url=False)]
+        ) from exc
+    parts = {upload.filename: await upload.read() for upload in attachments}
+    # Attachments are frozen, so the ones with a binary part are rebuilt around their bytes.
+    resolved = [
+        Attachment.from_bytes(attachment.filename, attachment.content_type, parts[attachment.filename])
+        if attachment.filename in parts
+        else attachment
+        for attachment in request.attachments
+    ]
+    return await analyze(request.model_copy(update={"attachments": resolved}))
@@ -1,16 +1,37 @@
 from __future__ import annotations
 
 import asyncio
+import itertools
+import os
+import secrets
 import time
-from uuid import uuid4
 
 from loguru import logger
 
 from shared import get_settings
-from shared.schemas import LLMBatchRequest, LLMResponse, TaskType
+from shared.schemas import LLMBatchRequest, LLMResponse, LLMTaskPrompt, TaskType
 
 settings = get_settings()
 
+_MODEL_VERSION = settings.model_version
+
+# Request ids are a random per-process prefix plus a counter: unique within the process by
+# construction and across processes unless two 48-bit prefixes collide, without a urandom call
+# per response. Forked children draw a fresh prefix so they never continue the parent's sequence.
+_REQUEST_ID_PREFIX = secrets.token_hex(6)
+_REQUEST_ID_COUNTER = itertools.count()
+
+
+def _reset_request_ids() -> None:
+    global _REQUEST_ID_PREFIX, _REQUEST_ID_COUNTER
+
+    _REQUEST_ID_PREFIX = secrets.token_hex(6)
+    _REQUEST_ID_COUNTER = itertools.count()
+
+
+if hasattr(os, "register_at_fork"):  # POSIX only
+    os.register_at_fork(after_in_child=_reset_request_ids)
+
 
 async def run_analysis(request: LLMBatchRequest) -> list[LLMResponse]:
     """
@@ -19,86 +40,215 @@ async def run_analysis(request: LLMBatchRequest) -> list[LLMResponse]:
     Replace this with real calls into Qwen2.5-VL (via vLLM, lmdeploy, or the RunPod SDK).
     """
 
-    start_time = time.perf_counter()
-
-    # Simulate some async workload while the real model would run.
-    results: list[LLMResponse] = []
-    for task_prompt in request.tasks:
-        task_start = time.perf_counter()
-        await asyncio.sleep(0.1)
-
-        parsed_json = _build_stub_payload(task_prompt.task)
-        raw_text = f"[stub] Completed {task_prompt.task} analysis for document {request.document_id}"
-        latency_ms = int((time.perf_counter() - task_start) * 1000)
-
-        logger.debug(
-            "Stub inference completed request=%s task=%s latency_ms=%s",
-            request.document_id,
-            task_prompt.task,
-            latency_ms,
-        )
+    start_ns = time.monotonic_ns()
+    # Repeated pages arrive as references to their first copy; the model sees every page in full.
+    request = request.resolve_content_refs()
 
-        results.append(
-            LLMResponse(
-                request_id=uuid4().hex,
-                document_id=request.document_id,
-                model_version=settings.model_version,
-                task=task_prompt.task,
-                raw_text=raw_text,
-                parsed_json=parsed_json,
-                tokens_input=None,
-                tokens_output=None,
-                latency_ms=latency_ms,
-            )
-        )
+    # Every task joins the shared micro-batch queue, so tasks from concurrent requests reach the
+    # model together; results keep the input order.
+    results = await _get_batcher().submit_request(request)
 
     logger.debug(
-        "Stub batch completed document=%s total_tasks=%s total_latency_ms=%s",
+        "Stub batch completed document={} total_tasks={} total_latency_ms={}",
         request.document_id,
         len(results),
-        int((time.perf_counter() - start_time) * 1000),
+        (time.monotonic_ns() - start_ns) // 1_000_000,
     )
 
     return results
 
 
-def _build_stub_payload(task: TaskType) -> dict:
-    if task == TaskType.ROOMS:
-        return {
-            "rooms": [
-                {
-                    "id": "room-1",
-                    "name": "Lobby",
-                    "area_m2": 42.0,
-                    "level": "Level 01",
-                    "polygon": [[0.1, 0.1], [0.6, 0.1], [0.6, 0.4], [0.1, 0.4]],
-                    "confidence": 0.5,
-                }
-            ]
-        }
-    if task == TaskType.LAYOUT:
-        return {"layout": [{"type": "wall", "points": [[0.0, 0.0], [1.0, 0.0]]}]}
-    if task == TaskType.ANNOTATIONS:
-        return {
-            "annotations": [
-                {"id": "a-1", "text": "Detail A", "bbox": [0.2, 0.2, 0.3, 0.25], "confidence": 0.6}
-            ],
-            "dimensions": [],
-        }
-    if task == TaskType.QA:
-        return {
-            "qa_results": [
-                {
-                    "rule": "min_corridor_width",
-                    "severity": "warning",
-                    "message": "Corridor between Grid B and C under 1.2m",
-                }
-            ]
-        }
-    if task == TaskType.COMPARE:
-        return {
-            "diffs": [
-                {"id": "diff-1", "description": "Lobby area increased by 5%", "severity": "info"}
-            ]
-        }
-    return {}
+def set_request_limit(limit: int | None) -> None:
+    """
+    Declare how many requests this process serves at once (None: unbounded, e.g. the HTTP app).
+
+    With every request slot taken no other prompt can join a batch, so the batcher dispatches
+    immediately instead of waiting out INFERENCE_BATCH_WAIT_MS.
+    """
+
+    global _request_limit
+
+    _request_limit = limit
+    if _batcher is not None:
+        _batcher.request_limit = limit
+
+
+async def close_batcher() -> None:
+    global _batcher
+
+    if _batcher is not None:
+        await _batcher.close()
+        _batcher = None
+
+
+async def _generate(items: list[tuple[LLMTaskPrompt, LLMBatchRequest]]) -> list[LLMResponse]:
+    """Run one micro-batch through the model; responses line up with `items`."""
+
+    batch_start_ns = time.monotonic_ns()
+    # Simulate some async workload while the real model would run.
+    await asyncio.sleep(0.1)
+    latency_ms = (time.monotonic_ns() - batch_start_ns) // 1_000_000
+    logger.debug("Stub inference completed batch_size={} latency_ms={}", len(items), latency_ms)
+
+    # Every field is produced here with its final type, so the responses skip validation.
+    construct = LLMResponse.model_construct
+    return [
+        construct(
+            request_id=f"{_REQUEST_ID_PREFIX}{next(_REQUEST_ID_COUNTER):x}",
+            document_id=request.document_id,
+            model_version=_MODEL_VERSION,
+            task=task_prompt.task,
+            raw_text=f"[stub] Completed {task_prompt.task} analysis for document {request.document_id}",
+            parsed_json=_STUB_PAYLOADS.get(task_prompt.task, {}),
+            tokens_input=None,
+            tokens_output=None,
+            latency_ms=latency_ms,
+        )
+        for task_prompt, request in items
+    ]
+
+
+class _MicroBatcher:
+    """
+    Collects task prompts from concurrent requests and hands them to the model in batches.
+
+    A batch is cut when it reaches `max_batch` items, `max_wait` seconds after its first item
+    arrived, or as soon as the queue is drained while all `request_limit` request slots are taken
+    (a request's prompts are queued together, so nothing else could join). Batches are dispatched
+    without waiting for the previous one to finish, so an engine with continuous batching stays fed.
+    """
+
+    def __init__(self, max_batch: int, max_wait: float, request_limit: int | None = None) -> None:
+        self._max_batch = max_batch
+        self._max_wait = max_wait
+        self.request_limit = request_limit
+        self._active_requests = 0
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue[tuple[LLMTaskPrompt, LLMBatchRequest, asyncio.Future[LLMResponse]]] = (
+            asyncio.Queue()
+        )
+        self._inflight: set[asyncio.Task] = set()
+        self._task = self._loop.create_task(self._run())
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    async def submit_request(self, request: LLMBatchRequest) -> list[LLMResponse]:
+        """Queue every task of the request at once and return the responses in task order."""
+
+        futures: list[asyncio.Future[LLMResponse]] = []
+        for task_prompt in request.tasks:
+            future = self._loop.create_future()
+            self._queue.put_nowait((task_prompt, request, future))
+            futures.append(future)
+
+        self._active_requests += 1
+        try:
+            return await asyncio.gather(*futures)
+        finally:
+            self._active_requests -= 1
+
+    async def close(self) -> None:
+        self._task.cancel()
+        for task in list(self._inflight):
+            task.cancel()
+        await asyncio.gather(self._task, *self._inflight, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self._max_wait
+            while len(batch) < self._max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                if self.request_limit is not None and self._active_requests >= self.request_limit:
+                    break
+                # Wait for the next prompt only until the deadline, rather than sleeping it out.
+                try:
+                    async with asyncio.timeout_at(deadline):
+                        batch.append(await self._queue.get())
+                except TimeoutError:
+                    break
+
+            task = self._loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(
+        self,
+        batch: list[tuple[LLMTaskPrompt, LLMBatchRequest, asyncio.Future[LLMResponse]]],
+    ) -> None:
+        try:
+            responses = await _generate([(task_prompt, request) for task_prompt, request, _ in batch])
+        except asyncio.CancelledError:
+            for _, _, future in batch:
+                future.cancel()
+            raise
+        except Exception as exc:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, _, future), response in zip(batch, responses):
+            # A caller that gave up has already cancelled its future.
+            if not future.done():
+                future.set_result(response)
+
+
+_batcher: _MicroBatcher | None = None
+_request_limit: int | None = None
+
+
+def _get_batcher() -> _MicroBatcher:
+    global _batcher
+
+    # The queue belongs to one event loop; a batcher left on a closed loop is replaced.
+    loop = asyncio.get_running_loop()
+    if _batcher is None or _batcher.loop is not loop:
+        _batcher = _MicroBatcher(
+            max_batch=max(1, settings.inference_max_batch_size),
+            max_wait=max(0.0, settings.inference_batch_wait_ms) / 1000,
+            request_limit=_request_limit,
+        )
+    return _batcher
+
+
+# Stub outputs, built once: every response for a task type shares the same (read-only) payload.
+_STUB_PAYLOADS: dict[TaskType, dict] = {
+    TaskType.ROOMS: {
+        "rooms": [
+            {
+                "id": "room-1",
+                "name": "Lobby",
+                "area_m2": 42.0,
+                "level": "Level 01",
+                "polygon": [[0.1, 0.1], [0.6, 0.1], [0.6, 0.4], [0.1, 0.4]],
+                "confidence": 0.5,
+            }
+        ]
+    },
+    TaskType.LAYOUT: {"layout": [{"type": "wall", "points": [[0.0, 0.0], [1.0, 0.0]]}]},
+    TaskType.ANNOTATIONS: {
+        "annotations": [
+            {"id": "a-1", "text": "Detail A", "bbox": [0.2, 0.2, 0.3, 0.25], "confidence": 0.6}
+        ],
+        "dimensions": [],
+    },
+    TaskType.QA: {
+        "qa_results": [
+            {
+                "rule": "min_corridor_width",
+                "severity": "warning",
+                "message": "Corridor between Grid B and C under 1.2m",
+            }
+        ]
+    },
+    TaskType.COMPARE: {
+        "diffs": [
+            {"id": "diff-1", "description": "Lobby area increased by 5%", "severity": "info"}
+        ]
+    },
+}
@@ -1,37 +1,57 @@
 from __future__ import annotations
 
-import asyncio
 from typing import Any, Dict, List
 
 from loguru import logger
 import runpod
-from pydantic import ValidationError
+from pydantic import TypeAdapter, ValidationError
 
-from shared.schemas import LLMBatchRequest
-from worker.inference import run_analysis
+from shared import get_settings
+from shared.schemas import LLMBatchRequest, LLMResponse
+from worker import inference
 
+settings = get_settings()
 
-async def _process_event(event: Dict[str, Any]) -> List[Dict[str, Any]]:
-    payload = event.get("input", {})
-    request = LLMBatchRequest.model_validate(payload)
-    responses = await run_analysis(request)
-    return [response.model_dump(mode="json") for response in responses]
+_RESPONSES_ADAPTER = TypeAdapter(List[LLMResponse])
+_REQUEST_ADAPTER = TypeAdapter(LLMBatchRequest)
 
 
-def handler(event: Dict[str, Any]) -> Dict[str, Any]:
+async def _process_event(event: Dict[str, Any]) -> List[Dict[str, Any]]:
+    payload = event.get("input", {})
+    if isinstance(payload, (str, bytes)):
+        # Input submitted as an encoded JSON document is parsed by pydantic-core directly,
+        # without building the intermediate dict.
+        request = _REQUEST_ADAPTER.validate_json(payload)
+    else:
+        request = _REQUEST_ADAPTER.validate_python(payload)
+    responses = await inference.run_analysis(request)
+    # The RunPod SDK JSON-encodes the handler's return value itself, so the results are dumped to
+    # plain JSON-compatible objects in a single serializer pass rather than model by model.
+    return _RESPONSES_ADAPTER.dump_python(responses, mode="json")
+
+
+async def handler(event: Dict[str, Any]) -> Dict[str, Any]:
+    # The SDK awaits async handlers on its own event loop, so concurrent jobs share the
+    # micro-batcher (and, later, the model engine) living on that loop.
     try:
-        results = asyncio.run(_process_event(event))
+        results = await _process_event(event)
         return {"results": results}
     except ValidationError as exc:
-        logger.error("Invalid payload received: %s", exc)
+        logger.error("Invalid payload received: {}", exc)
         return {"error": "validation_error", "details": exc.errors()}
     except Exception as exc:  # pragma: no cover - defensive logging
-        logger.exception("Unhandled error in serverless handler: %s", exc)
+        logger.exception("Unhandled error in serverless handler: {}", exc)
         return {"error": "internal_error", "message": str(exc)}
 
 
+def _concurrency(current_concurrency: int) -> int:
+    return max(1, settings.serverless_job_concurrency)
+
+
 def main() -> None:
-    runpod.serverless.start({"handler": handler})
+    # The SDK never runs more jobs than _concurrency() allows, so a batch need not wait for others.
+    inference.set_request_limit(max(1, settings.serverless_job_concurrency))
+    runpod.serverless.start({"handler": handler, "concurrency_modifier": _concurrency})
 
 
 if __name__ == "__main__":
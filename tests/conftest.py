@@ -0,0 +1,17 @@
+from pathlib import Path
+
+import pytest
+
+from gateway.services import storage
+
+
+@pytest.fixture
+def storage_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Point local storage at a fresh temporary directory."""
+
+    monkeypatch.setattr(storage.settings, "local_storage_root", str(tmp_path))
+    storage._storage_root.cache_clear()
+    storage._job_root.cache_clear()
+    yield tmp_path.resolve()
+    storage._storage_root.cache_clear()
+    storage._job_root.cache_clear()
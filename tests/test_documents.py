@@ -0,0 +1,69 @@
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+import gateway.main  # noqa: F401  (the package re-exports `app`, shadowing the module attribute)
+from gateway import tasks as gateway_tasks
+from gateway.routes import documents
+from gateway.store import DocumentStore
+from shared.schemas import DocumentStatus
+
+gateway_main = sys.modules["gateway.main"]
+
+STREAM_URL = f"{gateway_main.settings.api_prefix}/documents:stream"
+
+
+@pytest.fixture
+def client(storage_root, monkeypatch: pytest.MonkeyPatch):
+    queued: list[tuple[str, str]] = []
+    monkeypatch.setattr(documents, "document_store", DocumentStore())
+    monkeypatch.setattr(gateway_tasks, "warm_broker_connection", lambda: None)
+    monkeypatch.setattr(
+        gateway_tasks,
+        "enqueue_document_processing",
+        lambda job, path: queued.append((job.id, path)),
+    )
+    monkeypatch.setattr(gateway_main.settings, "max_upload_bytes", 1024)
+    with TestClient(gateway_main.app) as test_client:
+        test_client.queued = queued
+        yield test_client
+
+
+def _chunks(*parts: bytes):
+    yield from parts
+
+
+def test_stream_upload_is_stored_and_queued(client, storage_root) -> None:
+    response = client.post(STREAM_URL, content=b"%PDF-1.7 plan", headers={"X-Filename": "level%201.pdf"})
+
+    assert response.status_code == 201
+    job = response.json()
+    assert job["status"] == DocumentStatus.PROCESSING.value
+    assert job["filename"] == "level 1.pdf"
+    assert (storage_root / job["id"] / "level 1.pdf").read_bytes() == b"%PDF-1.7 plan"
+    assert client.queued == [(job["id"], job["storage_uri"])]
+
+
+def test_stream_upload_rejects_declared_oversize_body(client, storage_root) -> None:
+    response = client.post(STREAM_URL, content=b"x" * 2048, headers={"X-Filename": "plan.pdf"})
+
+    assert response.status_code == 413
+    # Refused from Content-Length alone: no job was created and nothing was written.
+    assert client.get(f"{gateway_main.settings.api_prefix}/documents").json() == []
+    assert list(storage_root.iterdir()) == []
+    assert client.queued == []
+
+
+def test_stream_upload_fails_job_for_oversize_chunked_body(client, storage_root) -> None:
+    response = client.post(
+        STREAM_URL,
+        content=_chunks(b"x" * 600, b"x" * 600),
+        headers={"X-Filename": "plan.pdf"},
+    )
+
+    assert response.status_code == 413
+    (job,) = client.get(f"{gateway_main.settings.api_prefix}/documents").json()
+    assert job["status"] == DocumentStatus.FAILED.value
+    assert not (storage_root / job["id"] / "plan.pdf").exists()
+    assert client.queued == []
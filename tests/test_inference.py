@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import pytest
+
+from shared.schemas import LLMBatchRequest, LLMTaskPrompt, TaskType
+from worker import inference
+
+
+def _request(document_id: str, *tasks: TaskType) -> LLMBatchRequest:
+    return LLMBatchRequest(
+        document_id=document_id,
+        page_indices=[0],
+        tasks=[LLMTaskPrompt(task=task, prompt=f"Run {task.value}") for task in tasks],
+    )
+
+
+@pytest.fixture
+def batches(monkeypatch: pytest.MonkeyPatch) -> list[list[str]]:
+    """Record the document id of every prompt handed to each `_generate` call."""
+
+    recorded: list[list[str]] = []
+    generate = inference._generate
+
+    async def recording_generate(items):
+        recorded.append([request.document_id for _, request in items])
+        return await generate(items)
+
+    monkeypatch.setattr(inference, "_generate", recording_generate)
+    monkeypatch.setattr(inference.settings, "inference_max_batch_size", 16)
+    monkeypatch.setattr(inference.settings, "inference_batch_wait_ms", 50.0)
+    yield recorded
+    inference.set_request_limit(None)
+
+
+def test_concurrent_requests_share_one_batch(batches: list[list[str]]) -> None:
+    async def scenario() -> list[list]:
+        try:
+            return await asyncio.gather(
+                inference.run_analysis(_request("doc-a", TaskType.LAYOUT, TaskType.ROOMS)),
+                inference.run_analysis(_request("doc-b", TaskType.QA)),
+            )
+        finally:
+            await inference.close_batcher()
+
+    results_a, results_b = asyncio.run(scenario())
+
+    assert batches == [["doc-a", "doc-a", "doc-b"]]
+    assert [(r.document_id, r.task) for r in results_a] == [("doc-a", TaskType.LAYOUT), ("doc-a", TaskType.ROOMS)]
+    assert [(r.document_id, r.task) for r in results_b] == [("doc-b", TaskType.QA)]
+
+
+def test_responses_follow_task_order(batches: list[list[str]]) -> None:
+    tasks = (TaskType.QA, TaskType.LAYOUT, TaskType.ROOMS, TaskType.LAYOUT)
+
+    async def scenario() -> list:
+        try:
+            return await inference.run_analysis(_request("doc-a", *tasks))
+        finally:
+            await inference.close_batcher()
+
+    results = asyncio.run(scenario())
+
+    assert [r.task for r in results] == list(tasks)
+    assert len({r.request_id for r in results}) == len(tasks)
+
+
+def test_lone_request_skips_batch_wait_at_request_limit(
+    batches: list[list[str]], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(inference.settings, "inference_batch_wait_ms", 2000.0)
+    inference.set_request_limit(1)
+
+    async def scenario() -> float:
+        start = time.monotonic()
+        try:
+            await inference.run_analysis(_request("doc-a", TaskType.LAYOUT))
+        finally:
+            await inference.close_batcher()
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(scenario())
+
+    assert batches == [["doc-a"]]
+    # The stub model takes 0.1 s; waiting out the batch window would take 2 s.
+    assert elapsed < 1.0
@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+import orjson
+import pytest
+
+from gateway.services.runpod_client import RunPodClient, _StatusPoller
+from shared.schemas import LLMBatchRequest, LLMTaskPrompt, TaskType
+
+ENDPOINT = "http://runpod-worker:8000"
+
+
+def _request(document_id: str) -> LLMBatchRequest:
+    return LLMBatchRequest(
+        document_id=document_id,
+        page_indices=[0],
+        tasks=[LLMTaskPrompt(task=TaskType.LAYOUT, prompt="Describe the layout")],
+    )
+
+
+def test_submit_batch_failure_cancels_sibling_requests() -> None:
+    finished: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        document_id = orjson.loads(request.content)["document_id"]
+        if document_id == "bad":
+            return httpx.Response(500, text="worker crashed")
+        await asyncio.sleep(0.5)
+        finished.append(document_id)
+        return httpx.Response(200, json={"responses": []})
+
+    async def scenario() -> None:
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(base_url=ENDPOINT, transport=transport) as http_client:
+            client = RunPodClient(endpoint=ENDPOINT, http_client=http_client)
+            with pytest.raises(RuntimeError, match="HTTP 500"):
+                await client.submit_batch([_request("slow"), _request("bad")])
+
+            assert client._inflight == {}
+            assert asyncio.all_tasks() == {asyncio.current_task()}
+            await asyncio.sleep(0.6)
+            await client.close()
+
+    asyncio.run(scenario())
+    assert finished == []
+
+
+def test_status_poller_close_fails_pending_fetch() -> None:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(30)
+        return httpx.Response(200, json={"status": "COMPLETED"})
+
+    async def scenario() -> None:
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(base_url=ENDPOINT, transport=transport) as http_client:
+            poller = _StatusPoller(http_client, {}, tick=0.01)
+            fetch = asyncio.create_task(poller.fetch("job-1"))
+            await asyncio.sleep(0.05)  # the sweep is now blocked in GET /status/job-1
+
+            poller.close()
+            with pytest.raises(RuntimeError, match="poller was closed"):
+                await asyncio.wait_for(fetch, timeout=1)
+
+    asyncio.run(scenario())
@@ -0,0 +1,14 @@
+from shared.schemas import Attachment, LLMBatchRequest
+
+
+def test_resolve_content_refs_copies_referenced_page_data() -> None:
+    first = Attachment.from_bytes("page-0000.jpg", "image/jpeg", b"jpeg-bytes", inline=True)
+    repeat = Attachment(filename="page-0001.jpg", content_type="image/jpeg", content_ref="page-0000.jpg")
+    sent = LLMBatchRequest(document_id="doc-1", page_indices=[0, 1], attachments=[first, repeat])
+
+    received = LLMBatchRequest.model_validate_json(sent.model_dump_json()).resolve_content_refs()
+
+    resolved = received.attachments[1]
+    assert resolved.filename == "page-0001.jpg"
+    assert resolved.content_ref is None
+    assert resolved.data_base64 == received.attachments[0].data_base64
@@ -0,0 +1,90 @@
+import sys
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from fastapi.testclient import TestClient
+
+import gateway.main  # noqa: F401  (the package re-exports `app`, shadowing the module attribute)
+from gateway import tasks as gateway_tasks
+from gateway.services import storage
+
+gateway_main = sys.modules["gateway.main"]
+
+
+@pytest.fixture
+def page(storage_root: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(storage.settings, "attachment_base_url", "http://gateway:8080")
+    monkeypatch.setattr(storage.settings, "attachment_signing_key", "test-key")
+    path = storage.get_local_workspace("job-1") / "page 0001.jpg"
+    path.write_bytes(b"jpeg bytes")
+    return path
+
+
+def _signed_parts(url: str) -> tuple[str, int, str]:
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    prefix = f"{storage.settings.api_prefix}/files/"
+    assert parts.path.startswith(prefix)
+    return parts.path[len(prefix):], int(query["expires"][0]), query["signature"][0]
+
+
+def test_presigned_url_round_trip(page: Path) -> None:
+    url = storage.presign(page)
+    assert url.startswith("http://gateway:8080/")
+
+    relative_path, expires, signature = _signed_parts(url)
+    assert relative_path == "job-1/workspace/page%200001.jpg"
+    assert storage.resolve_presigned("job-1/workspace/page 0001.jpg", expires, signature) == page
+
+
+def test_presigned_url_rejects_tampered_signature(page: Path) -> None:
+    _, expires, signature = _signed_parts(storage.presign(page))
+    tampered = ("0" if signature[0] != "0" else "1") + signature[1:]
+
+    assert storage.resolve_presigned("job-1/workspace/page 0001.jpg", expires, tampered) is None
+    # Extending the expiry invalidates the signature too.
+    assert storage.resolve_presigned("job-1/workspace/page 0001.jpg", expires + 60, signature) is None
+
+
+def test_presigned_url_expires(page: Path) -> None:
+    _, expires, signature = _signed_parts(storage.presign(page, ttl=-1))
+
+    assert expires < time.time()
+    assert storage.resolve_presigned("job-1/workspace/page 0001.jpg", expires, signature) is None
+
+
+def test_presigned_url_stays_under_storage_root(page: Path, storage_root: Path) -> None:
+    secret = storage_root.parent / f"{storage_root.name}-secret.txt"
+    secret.write_text("outside")
+    relative_path = f"../{secret.name}"
+    expires = int(time.time()) + 60
+
+    # Even a correctly signed path may not escape the storage root.
+    assert storage.resolve_presigned(relative_path, expires, storage._sign(relative_path, expires)) is None
+
+
+def test_files_route_serves_signed_urls_only(
+    page: Path, storage_root: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(gateway_tasks, "warm_broker_connection", lambda: None)
+    parts = urlsplit(storage.presign(page))
+    secret = storage_root.parent / f"{storage_root.name}-secret.txt"
+    secret.write_text("outside")
+    escape_path = f"../{secret.name}"
+    expires = int(time.time()) + 60
+
+    with TestClient(gateway_main.app) as client:
+        served = client.get(f"{parts.path}?{parts.query}")
+        tampered = client.get(f"{parts.path}?{parts.query.replace('signature=', 'signature=0')}")
+        # Percent-encoded so the client does not normalise the dot segment away.
+        traversal = client.get(
+            f"{storage.settings.api_prefix}/files/%2E%2E/{secret.name}",
+            params={"expires": expires, "signature": storage._sign(escape_path, expires)},
+        )
+
+    assert served.status_code == 200
+    assert served.content == b"jpeg bytes"
+    assert tampered.status_code == 404
+    assert traversal.status_code == 404
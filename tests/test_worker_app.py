@@ -0,0 +1,47 @@
+import json
+import sys
+
+from fastapi.testclient import TestClient
+
+import worker.app  # noqa: F401  (the package re-exports `app`, shadowing the module attribute)
+
+worker_app = sys.modules["worker.app"]
+
+
+def test_analyze_multipart_rejects_malformed_meta() -> None:
+    with TestClient(worker_app.app) as client:
+        response = client.post("/analyze/multipart", data={"meta": '{"document_id": "doc-1"'})
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][:2] == ["body", "meta"]
+
+
+def test_analyze_multipart_attaches_binary_parts(monkeypatch) -> None:
+    received = []
+
+    async def run_analysis(request):
+        received.append(request)
+        return []
+
+    monkeypatch.setattr(worker_app.inference, "run_analysis", run_analysis)
+    meta = {
+        "document_id": "doc-1",
+        "page_indices": [0, 1],
+        "tasks": [{"task": "layout", "prompt": "Describe the layout"}],
+        "attachments": [
+            {"filename": "page-0.jpg", "content_type": "image/jpeg"},
+            {"filename": "page-1.jpg", "content_type": "image/jpeg", "content_ref": "page-0.jpg"},
+        ],
+    }
+    with TestClient(worker_app.app) as client:
+        response = client.post(
+            "/analyze/multipart",
+            data={"meta": json.dumps(meta)},
+            files=[("attachments", ("page-0.jpg", b"jpeg bytes", "image/jpeg"))],
+        )
+
+    assert response.status_code == 200
+    (request,) = received
+    first, second = request.attachments
+    assert first.content == b"jpeg bytes"
+    assert second.content is None and second.content_ref == "page-0.jpg"